@@ -1041,32 +1041,20 @@ cities = [
 ]
 
 import time
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cityarray import CityArray
+import solvers
+from drawing import draw_route, RouteView, zoom_limits
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-import matplotlib.colors as mcolors
 
 def build_path(cities):
     if not cities: return []
 
-    # Start with city closest to origin (minimal x then y)
-    start = min(cities, key=lambda c: (c['x'], c['y']))
-    path = [start]
-    pool = [c for c in cities if c != start]
-
-    while pool:
-        # Evaluate dx and dy independently
-        scores = []
-        for c in pool:
-            dx = abs(c['x'] - path[-1]['x'])
-            dy = abs(c['y'] - path[-1]['y'])
-            scores.append((dx, dy, c))
-
-        # Sort by dx first, then dy — no combination
-        scores.sort(key=lambda item: (item[0], item[1]))
-        next_city = scores[0][2]
-        path.append(next_city)
-        pool.remove(next_city)
-
+    # Start with city closest to origin (minimal x then y), then step by
+    # dx first, then dy — no combination
+    path = [cities[i] for i in solvers.build_path_axis(CityArray.from_dicts(cities))]
     return path + [path[0]]  # Loop closure
 
 # 🎨 Draw cities and connections (2D/3D auto-detect)
@@ -1074,27 +1062,14 @@ def render(ax, path, zoom=1, dx=0, dy=0, limit=None):
     ax.clear()
     ax.set_facecolor('black')
     ax.set_xticks([]); ax.set_yticks([])
-    palette = list(mcolors.TABLEAU_COLORS.values())
-    draw_limit = limit if limit else len(path)
-
-    for i in range(1, draw_limit):
-        a, b = path[i - 1], path[i]
-        color = palette[i % len(palette)]
-        x = [a['x'] + dx, b['x'] + dx]
-        y = [a['y'] + dy, b['y'] + dy]
-        if 'z' in a and 'z' in b:
-            z = [a['z'], b['z']]
-            ax.plot(x, y, zs=z, color=color)
-        else:
-            ax.plot(x, y, color=color)
+    draw_route(ax, path, dx, dy, limit)  # one collection for all edges
 
-    if 'z' in path[0]:
-        ax.scatter([c['x'] + dx for c in path[:draw_limit]],
-                   [c['y'] + dy for c in path[:draw_limit]],
-                   [c['z'] for c in path[:draw_limit]], c='white', s=5)
-    else:
-        ax.scatter([c['x'] + dx for c in path[:draw_limit]],
-                   [c['y'] + dy for c in path[:draw_limit]], c='white', s=5)
+# 🔭 Draw only the edges inside the view limits (decimated when zoomed out)
+def render_view(ax, view, xlim=None, ylim=None):
+    ax.clear()
+    ax.set_facecolor('black')
+    ax.set_xticks([]); ax.set_yticks([])
+    view.draw(ax, xlim, ylim)
 
 # 🧮 Build path and log timing
 check_array = cities # use usa_states or cities
@@ -1116,14 +1091,14 @@ def update(frame):
 ani = FuncAnimation(fig, update, frames=len(path), interval=0, repeat=False, blit=False)
 
 # 🔍 Zoom and pan
-zoom, dx, dy = 1, 0, 0
+zoom = 1
+view = RouteView(path)  # edge index, built once
 def zoom_handler(e):
-    global zoom, dx, dy
+    global zoom
     factor = 1.1 if e.button == 'up' else 0.9
     zoom *= factor
-    dx = e.xdata - (e.xdata - dx) * factor
-    dy = e.ydata - (e.ydata - dy) * factor
-    render(ax, path, zoom, dx, dy)
+    xlim, ylim = zoom_limits(ax, e.xdata, e.ydata, factor)
+    render_view(ax, view, xlim, ylim)
     plt.draw()
 
 fig.canvas.mpl_connect('scroll_event', zoom_handler)
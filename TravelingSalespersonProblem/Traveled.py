@@ -1040,92 +1040,85 @@ cities = [
 	{'name': 'City999', 'x': 856, 'y': 176},
 ]
 
-import time, math
+import time
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cityarray import CityArray
+import solvers
+from drawing import draw_route, RouteView, zoom_limits
+from parallel import multi_start_nearest_neighbour
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-import matplotlib.colors as mcolors
-
-# 🔢 Euclidean distance between two cities
-def calc_dist(a, b):
-    return math.hypot(a['x'] - b['x'], a['y'] - b['y'])
 
 # 🧭 Path builder: nearest-neighbor + loop closure
 def build_path(cities):
     if not cities: return []
-    start = min(cities, key=lambda c: c['x'] + c['y'])
-    path, pool = [start], [c for c in cities if c != start]
-    while pool:
-        next_city = min(pool, key=lambda c: calc_dist(path[-1], c))
-        path.append(next_city)
-        pool.remove(next_city)
-    #return path[::-1] + [path[0]]  # reverse + loop
-    #return [path[0]] + path[::-1] # edited not correct
-    return path[::-1] + [path[::-1][0]]
+    order = solvers.build_path(CityArray.from_dicts(cities))  # reversed NN order
+    path = [cities[i] for i in order]
+    return path + [path[0]]
+
+# 🏁 Multi-start: nearest-neighbor from several start cities in parallel,
+# keep the shortest; runs holds per-start length and timing
+def build_path_multi(cities, starts=8, seed=None, processes=None):
+    if not cities: return [], []
+    ca = CityArray.from_dicts(cities)
+    first = int((ca.x + ca.y).argmin())  # the single-start default
+    order, runs = multi_start_nearest_neighbour(ca, starts, seed=seed, first=first, processes=processes, dim=2)
+    path = [cities[i] for i in order[::-1]]
+    return path + [path[0]], runs
 
 # 🎨 Draw cities and connections (2D/3D auto-detect)
 def render(ax, path, zoom=1, dx=0, dy=0, limit=None):
     ax.clear()
     ax.set_facecolor('black')
     ax.set_xticks([]); ax.set_yticks([])
-    palette = list(mcolors.TABLEAU_COLORS.values())
-    draw_limit = limit if limit else len(path)
+    draw_route(ax, path, dx, dy, limit)  # one collection for all edges
 
-    for i in range(1, draw_limit):
-        a, b = path[i - 1], path[i]
-        color = palette[i % len(palette)]
-        x = [a['x'] + dx, b['x'] + dx]
-        y = [a['y'] + dy, b['y'] + dy]
-        if 'z' in a and 'z' in b:
-            z = [a['z'], b['z']]
-            ax.plot(x, y, zs=z, color=color)
-        else:
-            ax.plot(x, y, color=color)
-
-    if 'z' in path[0]:
-        ax.scatter([c['x'] + dx for c in path[:draw_limit]],
-                   [c['y'] + dy for c in path[:draw_limit]],
-                   [c['z'] for c in path[:draw_limit]], c='white', s=5)
-    else:
-        ax.scatter([c['x'] + dx for c in path[:draw_limit]],
-                   [c['y'] + dy for c in path[:draw_limit]], c='white', s=5)
+# 🔭 Draw only the edges inside the view limits (decimated when zoomed out)
+def render_view(ax, view, xlim=None, ylim=None):
+    ax.clear()
+    ax.set_facecolor('black')
+    ax.set_xticks([]); ax.set_yticks([])
+    view.draw(ax, xlim, ylim)
 
-# 🧮 Build path and log timing
-t0 = time.perf_counter()
-path = build_path(cities)
-t1 = time.perf_counter()
-print(f"Sorted Path Length: {len(path)} | Time: {(t1 - t0) * 1000:.2f} ms")
-print(f"Start: {path[0]} | Penultimate: {path[-2]} | End: {path[-1]}")
+if __name__ == "__main__":
+    # 🧮 Build path and log timing
+    t0 = time.perf_counter()
+    path = build_path(cities)
+    t1 = time.perf_counter()
+    print(f"Sorted Path Length: {len(path)} | Time: {(t1 - t0) * 1000:.2f} ms")
+    print(f"Start: {path[0]} | Penultimate: {path[-2]} | End: {path[-1]}")
 
-# 🖼️ Plot setup
-fig = plt.figure()
-ax = fig.add_subplot(111, projection='3d' if 'z' in cities[0] else 'rectilinear')
+    # 🖼️ Plot setup
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d' if 'z' in cities[0] else 'rectilinear')
 
-# 🔄 Animation update function
-def update(frame):
-    render(ax, path, limit=frame + 1)
+    # 🔄 Animation update function
+    def update(frame):
+        render(ax, path, limit=frame + 1)
 
-ani = FuncAnimation(fig, update, frames=len(path), interval=50, repeat=False, blit=False)
+    ani = FuncAnimation(fig, update, frames=len(path), interval=50, repeat=False, blit=False)
 
-# 🔍 Zoom and pan
-zoom, dx, dy = 1, 0, 0
-def zoom_handler(e):
-    global zoom, dx, dy
-    factor = 1.1 if e.button == 'up' else 0.9
-    zoom *= factor
-    dx = e.xdata - (e.xdata - dx) * factor
-    dy = e.ydata - (e.ydata - dy) * factor
-    render(ax, path, zoom, dx, dy)
-    plt.draw()
+    # 🔍 Zoom and pan
+    zoom = 1
+    view = RouteView(path)  # edge index, built once
+    def zoom_handler(e):
+        global zoom
+        factor = 1.1 if e.button == 'up' else 0.9
+        zoom *= factor
+        xlim, ylim = zoom_limits(ax, e.xdata, e.ydata, factor)
+        render_view(ax, view, xlim, ylim)
+        plt.draw()
 
-fig.canvas.mpl_connect('scroll_event', zoom_handler)
+    fig.canvas.mpl_connect('scroll_event', zoom_handler)
 
-# 🖱️ Click to advance animation manually
-frame = [0]
-def click_handler(e):
-    if frame[0] < len(path) - 1:
-        frame[0] += 1
-        update(frame[0])
-        plt.draw()
+    # 🖱️ Click to advance animation manually
+    frame = [0]
+    def click_handler(e):
+        if frame[0] < len(path) - 1:
+            frame[0] += 1
+            update(frame[0])
+            plt.draw()
 
-fig.canvas.mpl_connect('button_press_event', click_handler)
-plt.show()
+    fig.canvas.mpl_connect('button_press_event', click_handler)
+    plt.show()
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cityarray import CityArray, tour_length
+import improve
+import solvers
+
+# Asyncio batch runner for many small routing jobs.
+#
+# Reads one JSON job per line, e.g.
+#   {"id": 7, "solver": "connect_cities", "cities": [{"x": 1, "y": 2}, ...],
+#    "options": {"improve": "two_opt"}, "timeout": 5}
+# and writes one JSON result per line as soon as each job finishes:
+#   {"id": 7, "status": "ok", "order": [...], "length": 12.3, "seconds": 0.01}
+# Status is "ok", "timeout" or "error" (with an "error" message).
+
+# Script function names mapped to their array-backed solvers
+SOLVERS = {
+    'zap': 'zap',
+    'build_path': 'build_path',
+    'sort_cities': 'morton_nearest_neighbour',
+    'connect_cities': 'connect',
+}
+
+# Extra seconds the dispatcher waits past a job's timeout when the worker
+# enforces it itself (see run_job), covering process start-up
+TIMEOUT_MARGIN = 1.0
+
+
+def _expire(signum, frame):
+    raise TimeoutError
+
+
+def run_job(job, timeout=None):
+    """Solve one job record in a worker process.
+
+    Where the platform has interval timers, `timeout` is also enforced in
+    the worker: the solve is interrupted so the process is freed at once
+    instead of running a result nobody will read to completion.
+    """
+    if timeout and hasattr(signal, 'setitimer'):
+        signal.signal(signal.SIGALRM, _expire)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _run(job)
+    finally:
+        if timeout and hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _run(job):
+    t0 = time.perf_counter()
+    ca = CityArray.from_dicts(job['cities'])
+    options = dict(job.get('options') or {})
+    stage = options.pop('improve', None)
+    name = job.get('solver', 'sort_cities')
+    solver = getattr(solvers, SOLVERS.get(name, name))
+    order = solver(ca, **options)
+    if stage:
+        order = getattr(improve, stage)(ca, order)[0]
+    return {
+        'order': order.tolist(),
+        'length': tour_length(ca, order) if len(order) else 0.0,
+        'seconds': time.perf_counter() - t0,
+    }
+
+
+async def _read_jobs(stream):
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, stream.readline)
+        if not line:
+            return
+        if line.strip():
+            yield line
+
+
+async def run(stream, out, workers=None, max_pending=None, timeout=None):
+    """Dispatch jobs from `stream` to a process pool, streaming results to `out`.
+
+    At most `max_pending` jobs are in flight; reading stops until a slot
+    frees, so the input is never buffered in full. Only `workers` of them
+    are handed to the pool at a time, so a job's clock starts when a
+    worker is free to run it, not while it waits in the pool's queue. A
+    job's own "timeout" overrides `timeout`. A timed-out job is reported
+    at once; its slots are released when the worker stops (immediately
+    where the worker can be interrupted, see `run_job`).
+    """
+    workers = workers or os.cpu_count() or 1
+    slots = asyncio.Semaphore(max_pending or 2 * workers)
+    running = asyncio.Semaphore(workers)
+    # Where workers time themselves out, their timer decides; the
+    # dispatcher's deadline is only a backstop
+    margin = TIMEOUT_MARGIN if hasattr(signal, 'setitimer') else 0.0
+    loop = asyncio.get_running_loop()
+    tasks = set()
+
+    def emit(record):
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+
+    def _finished(future):
+        running.release()
+        slots.release()
+        if not future.cancelled():
+            future.exception()  # a late worker timeout is already reported
+
+    async def handle(line, pool):
+        # Until the job reaches the pool its slot is this task's to free;
+        # after that _finished frees it when the worker is done
+        submitted = False
+        try:
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError(f'expected a JSON object, got {type(job).__name__}')
+                limit = job.get('timeout', timeout)
+                if limit is not None and not isinstance(limit, (int, float)):
+                    raise ValueError(f'timeout must be a number, got {limit!r}')
+            except ValueError as e:
+                emit({'id': None, 'status': 'error', 'error': f'bad job line: {e}'})
+                return
+            job_id = job.get('id')
+            await running.acquire()
+            try:
+                future = loop.run_in_executor(pool, run_job, job, limit)
+            except BaseException:
+                running.release()
+                raise
+            future.add_done_callback(_finished)
+            submitted = True
+        finally:
+            if not submitted:
+                slots.release()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), limit and limit + margin)
+        except (asyncio.TimeoutError, TimeoutError):
+            emit({'id': job_id, 'status': 'timeout'})
+        except Exception as e:
+            emit({'id': job_id, 'status': 'error', 'error': f'{type(e).__name__}: {e}'})
+        else:
+            emit({'id': job_id, 'status': 'ok', **result})
+
+    with ProcessPoolExecutor(workers) as pool:
+        async for line in _read_jobs(stream):
+            await slots.acquire()
+            task = asyncio.create_task(handle(line, pool))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run JSON-lines routing jobs in a process pool.')
+    parser.add_argument('jobs', nargs='?', help='job file (default: stdin)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--max-pending', type=int, default=None, help='jobs in flight (default: 2 x workers)')
+    parser.add_argument('--timeout', type=float, default=None, help='default per-job timeout in seconds')
+    args = parser.parse_args(argv)
+
+    stream = open(args.jobs) if args.jobs else sys.stdin
+    try:
+        asyncio.run(run(stream, sys.stdout, args.workers, args.max_pending, args.timeout))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import os
+
+import numpy as np
+
+# Compact structure-of-arrays city storage shared by all solvers.
+# A city costs 3 coordinate floats plus one integer id instead of a full
+# dict, and solvers pass around integer index arrays into these columns.
+
+
+class CityArray:
+    """Cities stored as contiguous x/y/z columns, an id column and names.
+
+    `z` is None for 2D data. Index arrays returned by the solvers index
+    into these columns (and into the list the CityArray was built from).
+    Without explicit ids or names neither is stored per city: ids are the
+    positions and names an Unnamed placeholder.
+    """
+
+    __slots__ = ('x', 'y', 'z', '_ids', 'names')
+
+    def __init__(self, x, y, z=None, ids=None, names=None, dtype=np.float64):
+        self.x = np.ascontiguousarray(x, dtype=dtype)
+        self.y = np.ascontiguousarray(y, dtype=dtype)
+        self.z = None if z is None else np.ascontiguousarray(z, dtype=dtype)
+        self._ids = None if ids is None else np.ascontiguousarray(ids, dtype=np.int64)
+        if names is None:
+            names = Unnamed(len(self.x))
+        self.names = names if isinstance(names, (NameTable, Unnamed)) else list(names)
+
+    @classmethod
+    def from_dicts(cls, cities, dtype=np.float64):
+        """Build from the list-of-dicts format used by the scripts."""
+        n = len(cities)
+        x = np.fromiter((c.get('x', 0) for c in cities), dtype=dtype, count=n)
+        y = np.fromiter((c.get('y', 0) for c in cities), dtype=dtype, count=n)
+        z = None
+        if n and 'z' in cities[0]:
+            z = np.fromiter((c.get('z', 0) for c in cities), dtype=dtype, count=n)
+        names = [c.get('name') for c in cities]
+        return cls(x, y, z, names=names, dtype=dtype)
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def has_z(self):
+        return self.z is not None
+
+    @property
+    def dim(self):
+        return 3 if self.z is not None else 2
+
+    @property
+    def ids(self):
+        """Original city ids; built on access when they are the positions."""
+        return np.arange(len(self), dtype=np.int64) if self._ids is None else self._ids
+
+    @property
+    def nbytes(self):
+        """Bytes held by the numeric columns (names excluded)."""
+        total = self.x.nbytes + self.y.nbytes + (self._ids.nbytes if self._ids is not None else 0)
+        return total + (self.z.nbytes if self.z is not None else 0)
+
+    def coords(self, idx=None, dim=None):
+        """Return an (n, d) float array of coordinates, optionally for `idx`.
+
+        `dim` limits the result to the first `dim` axes (e.g. 2 to ignore z).
+        """
+        cols = [self.x, self.y] if self.z is None else [self.x, self.y, self.z]
+        if dim is not None:
+            cols = cols[:dim]
+        if idx is not None:
+            cols = [c[idx] for c in cols]
+        return np.column_stack(cols)
+
+    def save(self, base):
+        """Write the columns as `base`.coords.npy plus a NameTable.
+
+        Coordinates are stored as one (dim, n) array so `load` can hand
+        out each column as a contiguous memory-mapped row. Ids are not
+        stored.
+        """
+        cols = [self.x, self.y] if self.z is None else [self.x, self.y, self.z]
+        np.save(base + '.coords.npy', np.stack(cols))
+        NameTable.build(self.names).save(base)
+
+    @classmethod
+    def load(cls, base, mmap_mode='r'):
+        """Open columns written by `save`, memory-mapped read-only by default.
+
+        Nothing is parsed or copied, and processes that map the same files
+        share their pages.
+        """
+        cols = np.load(base + '.coords.npy', mmap_mode=mmap_mode)
+        names = NameTable.load(base, mmap_mode)
+        return cls(cols[0], cols[1], cols[2] if len(cols) > 2 else None, names=names, dtype=cols.dtype)
+
+    def take(self, idx):
+        """Return a new CityArray holding the cities at `idx`, ids preserved."""
+        idx = np.asarray(idx, dtype=np.intp)
+        z = None if self.z is None else self.z[idx]
+        ids = idx.astype(np.int64) if self._ids is None else self._ids[idx]
+        if isinstance(self.names, Unnamed):
+            names = Unnamed(len(idx))
+        else:
+            names = [self.names[i] for i in idx.tolist()]
+        return CityArray(self.x[idx], self.y[idx], z, ids, names, dtype=self.x.dtype)
+
+    def to_dicts(self, idx=None):
+        """Rebuild the dict format, e.g. for code that still expects it."""
+        idx = range(len(self)) if idx is None else np.asarray(idx).tolist()
+        xs, ys = self.x.tolist(), self.y.tolist()
+        zs = self.z.tolist() if self.z is not None else None
+        out = []
+        for i in idx:
+            city = {'name': self.names[i], 'x': xs[i], 'y': ys[i]}
+            if zs is not None:
+                city['z'] = zs[i]
+            out.append(city)
+        return out
+
+
+class NameTable:
+    """Read-only sequence of names kept as utf-8 bytes in one blob.
+
+    Name i is blob[offsets[i]:offsets[i + 1]]; `missing` flags None
+    entries (None when there are none). Names are decoded on access.
+    """
+
+    __slots__ = ('offsets', 'blob', 'missing')
+
+    def __init__(self, offsets, blob, missing=None):
+        self.offsets = offsets
+        self.blob = blob
+        self.missing = missing
+
+    @classmethod
+    def build(cls, names):
+        encoded = [b'' if name is None else str(name).encode('utf-8') for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        missing = np.fromiter((name is None for name in names), dtype=bool, count=len(encoded))
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(offsets, blob, missing if missing.any() else None)
+
+    def save(self, base):
+        np.save(base + '.names.idx.npy', self.offsets)
+        with open(base + '.names.bin', 'wb') as f:
+            f.write(self.blob.tobytes())
+        if self.missing is not None:
+            np.save(base + '.names.null.npy', self.missing)
+        elif os.path.exists(base + '.names.null.npy'):
+            os.remove(base + '.names.null.npy')
+
+    @classmethod
+    def load(cls, base, mmap_mode='r'):
+        offsets = np.load(base + '.names.idx.npy', mmap_mode=mmap_mode)
+        if os.path.getsize(base + '.names.bin'):
+            blob = np.memmap(base + '.names.bin', dtype=np.uint8, mode=mmap_mode or 'r')
+        else:
+            blob = np.empty(0, dtype=np.uint8)  # mmap cannot map an empty file
+        missing = None
+        if os.path.exists(base + '.names.null.npy'):
+            missing = np.load(base + '.names.null.npy', mmap_mode=mmap_mode)
+        return cls(offsets, blob, missing)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('name index out of range')
+        if self.missing is not None and self.missing[i]:
+            return None
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class Unnamed:
+    """Read-only sequence of `n` missing (None) names, held in O(1) memory."""
+
+    __slots__ = ('n',)
+
+    def __init__(self, n):
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [None] * len(range(*i.indices(self.n)))
+        if not -self.n <= i < self.n:
+            raise IndexError('name index out of range')
+        return None
+
+    def __iter__(self):
+        return (None for _ in range(self.n))
+
+
+def tour_length(ca, order, closed=True, dim=None):
+    """Euclidean length of the tour `order` (an index array)."""
+    pts = ca.coords(order, dim=dim)
+    seg = np.diff(pts, axis=0)
+    total = float(np.sqrt((seg * seg).sum(axis=1)).sum())
+    if closed and len(pts) > 1:
+        total += float(np.sqrt(((pts[0] - pts[-1]) ** 2).sum()))
+    return total
@@ -0,0 +1,129 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are not serialized
+    fcntl = None
+
+from cityarray import CityArray
+
+# Binary sidecar cache for parsed datasets. Next to `data.json` a
+# `data.json.cache/` directory holds meta.json, which records the source
+# file's size, mtime and sha256, and one generation directory with each
+# section of the dataset as memory-mapped .npy columns (see
+# CityArray.save). A later load reuses the sidecar when the mtime still
+# matches, or when the mtime moved but the content hash did not.
+#
+# Files that were handed out are never rewritten, since other loads (in
+# this or another process) may still have them mapped and truncating
+# them would crash those readers with SIGBUS. A rebuild writes a new
+# generation directory, switches meta.json to it, and only then unlinks
+# older generations; open mappings keep their pages until released.
+# Rebuilds hold an exclusive lock on build.lock, so concurrent loaders
+# build one generation between them and none is left behind.
+
+VERSION = 2
+
+
+def sidecar_dir(path):
+    return path + '.cache'
+
+
+def file_hash(path, chunk_bytes=1 << 24):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_bytes), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(folder):
+    try:
+        with open(os.path.join(folder, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == VERSION else None
+
+
+def _write_meta(folder, meta):
+    # Written last and replaced atomically: a sidecar without a current
+    # meta.json is never trusted
+    tmp = os.path.join(folder, f'meta.json.{os.getpid()}.{time.time_ns()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(folder, 'meta.json'))
+
+
+def _fresh(path, meta):
+    st = os.stat(path)
+    if meta is None or meta['size'] != st.st_size:
+        return False
+    if meta['mtime_ns'] == st.st_mtime_ns:
+        return True
+    if meta['sha256'] != file_hash(path):
+        return False
+    # Same content under a new mtime (e.g. a fresh checkout)
+    meta['mtime_ns'] = st.st_mtime_ns
+    _write_meta(sidecar_dir(path), meta)
+    return True
+
+
+def _open(folder, meta):
+    data = os.path.join(folder, meta['data'])
+    return {name: CityArray.load(os.path.join(data, name)) for name in meta['sections']}
+
+
+@contextlib.contextmanager
+def _build_lock(folder):
+    with open(os.path.join(folder, 'build.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_cached(path, parse):
+    """Return {section: CityArray} for `path`, from its sidecar when fresh.
+
+    `parse(path)` builds the sections (a dict of CityArrays) when the
+    sidecar is missing or stale; they are then written out and reopened
+    memory-mapped, so every caller gets the same read-only layout.
+    """
+    folder = sidecar_dir(path)
+    meta = _read_meta(folder)
+    if _fresh(path, meta):
+        try:
+            return _open(folder, meta)
+        except FileNotFoundError:
+            pass  # another process replaced the generation meanwhile
+    os.makedirs(folder, exist_ok=True)
+    with _build_lock(folder):
+        # Whoever held the lock before may have just rebuilt it
+        meta = _read_meta(folder)
+        if _fresh(path, meta):
+            return _open(folder, meta)
+        st = os.stat(path)
+        sections = parse(path)
+        # A name no other build uses, so nothing mapped is ever overwritten
+        data = os.path.join(folder, f'gen-{os.getpid()}-{time.time_ns()}')
+        os.makedirs(data)
+        for name, ca in sections.items():
+            ca.save(os.path.join(data, name))
+        meta = {'version': VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                'sha256': file_hash(path), 'sections': list(sections),
+                'data': os.path.basename(data)}
+        _write_meta(folder, meta)
+        # Unlinking keeps mapped pages alive; only later opens miss them
+        for entry in os.listdir(folder):
+            if entry.startswith('gen-') and entry != meta['data']:
+                shutil.rmtree(os.path.join(folder, entry), ignore_errors=True)
+    return _open(folder, meta)
@@ -0,0 +1,102 @@
+import numpy as np
+
+from cityarray import CityArray
+from improve import two_opt, two_opt_path
+from parallel import solve_groups
+import solvers
+
+# Karp-style partition and stitch for inputs far beyond what one tour
+# search can hold: split the plane into balanced cells, solve each cell
+# on its own in a worker process, then join the cell tours in cell order
+# and repair the seams.
+
+
+def partition(ca, cell_size):
+    """Split cities into cells of at most `cell_size` by k-d median cuts.
+
+    Each cut is made on the wider axis of the current cell, so cells stay
+    balanced in count and roughly square. Returns a list of index arrays.
+    """
+    x, y = ca.x, ca.y
+    cells = []
+    stack = [np.arange(len(ca))]
+    while stack:
+        idx = stack.pop()
+        if len(idx) <= cell_size:
+            cells.append(idx)
+            continue
+        cx, cy = x[idx], y[idx]
+        values = cx if np.ptp(cx) >= np.ptp(cy) else cy
+        mid = len(idx) // 2
+        part = np.argpartition(values, mid)
+        stack.append(idx[part[mid:]])
+        stack.append(idx[part[:mid]])
+    return cells
+
+
+def _cell_order(ca, cells):
+    # Visit cells along a short tour of their centroids
+    cx = np.array([ca.x[c].mean() for c in cells])
+    cy = np.array([ca.y[c].mean() for c in cells])
+    centres = CityArray(cx, cy)
+    order, _ = two_opt(centres, solvers.hilbert(centres))
+    return order, np.column_stack((cx, cy))
+
+
+def _stitch(ca, tours, centres):
+    """Join closed cell tours into one tour, cell by cell.
+
+    Each cell is entered at its city nearest to where the previous cell
+    was left, and walked in the direction whose last city is closer to
+    the next cell's centre. Returns the tour and the seam positions.
+    """
+    pts = ca.coords(dim=2)
+    out = []
+    seams = []
+    exit_point = centres[-1]
+    for c, tour in enumerate(tours):
+        if not len(tour):
+            continue
+        local = pts[tour]
+        entry = int(np.argmin(((local - exit_point) ** 2).sum(axis=1)))
+        walk = np.roll(tour, -entry)
+        target = centres[(c + 1) % len(centres)]
+        backward = np.concatenate((walk[:1], walk[1:][::-1]))
+        if len(walk) > 2 and ((pts[backward[-1]] - target) ** 2).sum() < ((pts[walk[-1]] - target) ** 2).sum():
+            walk = backward
+        seams.append(len(out))
+        out.extend(walk.tolist())
+        exit_point = pts[walk[-1]]
+    return np.asarray(out, dtype=np.intp), seams
+
+
+def partition_solve(ca, cell_size=5000, solver='greedy_edge', improver='two_opt',
+                    processes=None, window=40):
+    """Solve a large instance by partitioning, parallel cell solves and stitching.
+
+    `solver` and `improver` name functions in solvers.py / improve.py and
+    run independently per cell in worker processes, each holding only its
+    own cell. `window` cities either side of every seam are then re-optimized
+    with a fixed-end 2-opt. Returns the tour and the seam repair gain.
+    """
+    n = len(ca)
+    if n <= cell_size:
+        order = solve_groups(ca, [np.arange(n)], solver, 1, improver)[0]
+        return order, 0.0
+    cells = partition(ca, cell_size)
+    cell_order, centres = _cell_order(ca, cells)
+    cells = [cells[c] for c in cell_order]
+    tours = solve_groups(ca, cells, solver, processes, improver)
+    tour, seams = _stitch(ca, tours, centres[cell_order])
+
+    # Boundary repair: rotate so no window wraps, then fix each seam
+    pts = ca.coords(dim=2)
+    shift = min(window, n // 2)
+    tour = np.roll(tour, shift)
+    total = 0.0
+    for s in seams:
+        s = (s + shift) % n
+        lo, hi = max(0, s - window), min(n, s + window)
+        tour[lo:hi], gain = two_opt_path(pts, tour[lo:hi])
+        total += gain
+    return tour, total
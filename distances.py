@@ -0,0 +1,166 @@
+import os
+import tempfile
+
+import numpy as np
+
+# Precomputed pairwise distances for mid-size instances (roughly 5k-50k
+# cities), where O(1) lookups pay for the n^2 / 2 table. Distances are
+# symmetric, so only the upper triangle is stored, as float32, in the
+# condensed order scipy uses: (0,1), (0,2) .. (0,n-1), (1,2) ..
+
+
+class DistanceMatrix:
+    """Condensed float32 distance table over the cities of a CityArray.
+
+    The table is filled in row blocks of about `block_bytes` of scratch
+    space. Tables larger than `max_bytes` go to a memory-mapped file
+    (`path`, or a temporary file removed by `close`) instead of RAM.
+    `dim=2` ignores z.
+    """
+
+    def __init__(self, ca, dim=None, max_bytes=1 << 30, path=None, block_bytes=1 << 25):
+        self.n = n = len(ca)
+        self.block_bytes = block_bytes
+        self._temp = None
+        size = n * (n - 1) // 2
+        if size * 4 > max_bytes:
+            if path is None:
+                fd, path = tempfile.mkstemp(suffix='.dist')
+                os.close(fd)
+                self._temp = path
+            self.data = np.memmap(path, dtype=np.float32, mode='w+', shape=(size,))
+        else:
+            self.data = np.empty(size, dtype=np.float32)
+        self.path = path if size * 4 > max_bytes else None
+        self._fill(ca.coords(dim=dim))
+
+    def _offset(self, i):
+        # Position of pair (i, i + 1) in the condensed table
+        return i * (2 * self.n - i - 1) // 2
+
+    def _rows_per_block(self):
+        return max(1, self.block_bytes // (8 * max(1, self.n)))
+
+    def _fill(self, pts):
+        n = self.n
+        step = self._rows_per_block()
+        for i0 in range(0, n - 1, step):
+            i1 = min(n - 1, i0 + step)
+            # Block rows i0..i1 against columns i0..n, axis by axis
+            d2 = np.zeros((i1 - i0, n - i0))
+            for axis in range(pts.shape[1]):
+                diff = pts[i0:i1, axis, None] - pts[None, i0:, axis]
+                d2 += diff * diff
+            # The strict upper triangle of the block, row-major, is exactly
+            # the condensed range of rows i0..i1
+            upper = np.arange(n - i0)[None, :] > np.arange(i1 - i0)[:, None]
+            self.data[self._offset(i0):self._offset(i1)] = np.sqrt(d2[upper])
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def index(self, i, j):
+        """Condensed positions of pairs (i, j), i != j (arrays allowed)."""
+        i, j = np.asarray(i, dtype=np.int64), np.asarray(j, dtype=np.int64)
+        lo, hi = np.minimum(i, j), np.maximum(i, j)
+        return lo * (2 * self.n - lo - 1) // 2 + (hi - lo - 1)
+
+    def dist(self, i, j):
+        """Distance between cities i and j (arrays allowed; 0 where i == j)."""
+        same = np.asarray(i) == np.asarray(j)
+        if np.ndim(same) == 0:
+            return 0.0 if same else float(self.data[self.index(i, j)])
+        out = np.zeros(same.shape, dtype=np.float32)
+        out[~same] = self.data[self.index(np.asarray(i)[~same], np.asarray(j)[~same])]
+        return out
+
+    def rows(self, i0, i1):
+        """Full rows i0..i1 as an (i1 - i0, n) float32 block.
+
+        Columns below i0 are gathered from earlier rows in chunks that
+        read contiguous runs of the table; the rest are row slices.
+        """
+        n = self.n
+        rows = i1 - i0
+        out = np.empty((rows, n), dtype=np.float32)
+        data = self.data
+        for r, i in enumerate(range(i0, i1)):
+            start = self._offset(i)
+            out[r, i + 1:] = data[start:start + n - i - 1]
+            out[r, i] = 0.0
+        # Inside the block: mirror the upper triangle
+        sub = out[:, i0:i1]
+        lower = np.tril_indices(rows, -1)
+        sub[lower] = sub.T[lower]
+        # Left of the block: row j holds (j, i0..i1) contiguously
+        chunk = max(1, self.block_bytes // (8 * rows))
+        step = np.arange(rows)
+        for j0 in range(0, i0, chunk):
+            j = np.arange(j0, min(i0, j0 + chunk))
+            start = j * (2 * n - j - 1) // 2 + (i0 - j - 1)
+            out[:, j0:j0 + len(j)] = data[start[:, None] + step].T
+        return out
+
+    def row(self, i):
+        return self.rows(i, i + 1)[0]
+
+    def tour_length(self, order, closed=True):
+        order = np.asarray(order, dtype=np.intp)
+        if len(order) < 2:
+            return 0.0
+        a, b = order[:-1], order[1:]
+        if closed:
+            a, b = np.append(a, order[-1]), np.append(b, order[0])
+        return float(self.dist(a, b).sum(dtype=np.float64))
+
+    def neighbours(self, k):
+        """(n, k) nearest neighbour lists, closest first, for improve.py."""
+        n = self.n
+        k = max(0, min(int(k), n - 1))
+        out = np.empty((n, k), dtype=np.intp)
+        if not k:
+            return out
+        step = self._rows_per_block()
+        for i0 in range(0, n, step):
+            i1 = min(n, i0 + step)
+            block = self.rows(i0, i1)
+            block[np.arange(i1 - i0), np.arange(i0, i1)] = np.inf
+            part = np.argpartition(block, k - 1, axis=1)[:, :k]
+            near = np.take_along_axis(block, part, axis=1)
+            out[i0:i1] = np.take_along_axis(part, np.argsort(near, axis=1, kind='stable'), axis=1)
+        return out
+
+    def nearest_neighbour(self, start=0):
+        """Exact nearest-neighbour tour read from the table (ties: lower index)."""
+        n = self.n
+        if not n:
+            return np.empty(0, dtype=np.intp)
+        visited = np.zeros(n, dtype=bool)
+        path = np.empty(n, dtype=np.intp)
+        current = start
+        for step in range(n):
+            path[step] = current
+            visited[current] = True
+            if step == n - 1:
+                break
+            row = self.row(current)
+            row[visited] = np.inf
+            current = int(np.argmin(row))
+        return path
+
+    def close(self):
+        """Release a memory-mapped table and remove its temporary file."""
+        self.data = None
+        if self._temp is not None:
+            os.remove(self._temp)
+            self._temp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
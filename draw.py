@@ -1,54 +1,19 @@
-import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.animation import FuncAnimation
-import matplotlib.colors as mcolors
-
-# Function to spread bits (Morton Order)
-def spread_bits(v):
-    v = (v | (v << 8)) & 0x00FF00FF
-    v = (v | (v << 4)) & 0x0F0F0F0F
-    v = (v | (v << 2)) & 0x33333333
-    v = (v | (v << 1)) & 0x55555555
-    return v
-
-# Function to compute Morton Order
-def morton_order(city):
-    x, y = city['x'], city['y']
-    x = int(x * 10000)
-    y = int(y * 10000)
-    return spread_bits(x) | (spread_bits(y) << 1)
+from cityarray import CityArray
+from solvers import morton_nearest_neighbour
+from drawing import draw_route, RouteView, zoom_limits
 
 # Function to sort and connect cities based on combined metrics of x, y, and optional values
 def sort_cities(cities):
     if not len(cities):
         print("No cities to process. Please check the input data.")
         return []
-    
-    cities_sorted = sorted(cities, key=morton_order)
-    sorted_path = [cities_sorted.pop(0)]
-
-    while len(cities_sorted):
-        current_city = sorted_path[-1]
-        current_coords = [current_city.get('x', 0), current_city.get('y', 0)]
-        if 'z' in current_city:
-            current_coords.append(current_city['z'])
-
-        min_distance = float('inf')
-        closest_city_idx = -1
-        
-        for i, city in enumerate(cities_sorted):
-            city_coords = [city.get('x', 0), city.get('y', 0)]
-            if 'z' in city:
-                city_coords.append(city['z'])
-            
-            distance = np.linalg.norm(np.array(city_coords) - np.array(current_coords))
-            if distance < min_distance:
-                min_distance = distance
-                closest_city_idx = i
-
-        sorted_path.append(cities_sorted.pop(closest_city_idx))
 
+    # Morton-ordered nearest neighbour on the array-backed cities
+    order = morton_nearest_neighbour(CityArray.from_dicts(cities))
+    sorted_path = [cities[i] for i in order]
     sorted_path.append(sorted_path[0])  # Complete the loop
     return sorted_path
 
@@ -59,29 +24,16 @@ def draw_cities(ax, sorted_path, zoom_level=1, offset_x=0, offset_y=0):
     ax.set_xticks([])
     ax.set_yticks([])
 
-    colors = list(mcolors.TABLEAU_COLORS.values())
-    
-    for index in range(1, len(sorted_path)):
-        city = sorted_path[index]
-        prev_city = sorted_path[index - 1]
-        color = colors[index % len(colors)]
-        x_coords = [prev_city.get('x', 0) + offset_x, city.get('x', 0) + offset_x]
-        y_coords = [prev_city.get('y', 0) + offset_y, city.get('y', 0) + offset_y]
-        if 'z' in city and 'z' in prev_city:
-            z_coords = [prev_city.get('z', 0), city.get('z', 0)]
-            ax.plot(x_coords, y_coords, zs=z_coords, color=color)
-        else:
-            ax.plot(x_coords, y_coords, color=color)
-
-    if 'z' in sorted_path[0]:
-        ax.scatter([city.get('x', 0) + offset_x for city in sorted_path], 
-                   [city.get('y', 0) + offset_y for city in sorted_path], 
-                   [city.get('z', 0) for city in sorted_path], 
-                   c='white', s=5)
-    else:
-        ax.scatter([city.get('x', 0) + offset_x for city in sorted_path], 
-                   [city.get('y', 0) + offset_y for city in sorted_path], 
-                   c='white', s=5)
+    # One line collection plus one scatter, palette cycling as before
+    draw_route(ax, sorted_path, offset_x, offset_y)
+
+# Draw the part of the route inside the given view limits
+def draw_view(ax, route_view, xlim=None, ylim=None):
+    ax.clear()
+    ax.set_facecolor('black')
+    ax.set_xticks([])
+    ax.set_yticks([])
+    route_view.draw(ax, xlim, ylim)
 
 # Animation loop
 def animate(frame, sorted_path, ax):
@@ -142,18 +94,17 @@ else:
 
     ani = FuncAnimation(fig, animate, frames=len(sorted_path), fargs=(sorted_path, ax), interval=1, repeat=False)
 
-    # Zoom functionality
+    # Zoom functionality: only edges in view are drawn, decimated when
+    # zoomed out far enough to show more than the segment cap
     zoom_level = 1
-    offset_x = 0
-    offset_y = 0
+    route_view = RouteView(sorted_path)
 
     def on_scroll(event):
-        global zoom_level, offset_x, offset_y
+        global zoom_level
         zoom_factor = 1.1 if event.button == 'up' else 0.9
         zoom_level *= zoom_factor
-        offset_x = event.xdata - (event.xdata - offset_x) * zoom_factor
-        offset_y = event.ydata - (event.ydata - offset_y) * zoom_factor
-        draw_cities(ax, sorted_path, zoom_level, offset_x, offset_y)
+        xlim, ylim = zoom_limits(ax, event.xdata, event.ydata, zoom_factor)
+        draw_view(ax, route_view, xlim, ylim)
         plt.draw()
 
     fig.canvas.mpl_connect('scroll_event', on_scroll)
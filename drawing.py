@@ -0,0 +1,335 @@
+import numpy as np
+import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+from spatial import SegmentIndex
+
+# Vectorized route drawing shared by the scripts. A route (list of city
+# dicts, or an (m, d) coordinate array) becomes one line collection whose
+# colours cycle through the Tableau palette exactly like the old
+# one-ax.plot-per-edge loops: edge i (ending at city i) gets
+# palette[i % len(palette)].
+
+PALETTE = list(mcolors.TABLEAU_COLORS.values())
+_PALETTE_RGBA = mcolors.to_rgba_array(PALETTE)
+
+
+def route_coords(path, limit=None):
+    """(m, 2) or (m, 3) float array for the first `limit` cities of a route.
+
+    z is used when the first city has it, as the scripts decide 2D/3D.
+    Missing values read as 0.
+    """
+    if isinstance(path, np.ndarray):
+        return path[:limit or None]
+    path = path[:limit] if limit else path
+    m = len(path)
+    keys = ('x', 'y', 'z') if m and 'z' in path[0] else ('x', 'y')
+    return np.column_stack([np.fromiter((c.get(k, 0) for c in path), dtype=np.float64, count=m)
+                            for k in keys]).reshape(m, len(keys))
+
+
+def route_segments(pts, dx=0, dy=0):
+    """(m - 1, 2, d) segment array joining consecutive points, x/y shifted."""
+    pts = np.array(pts, dtype=np.float64)
+    pts[:, 0] += dx
+    pts[:, 1] += dy
+    return np.stack((pts[:-1], pts[1:]), axis=1)
+
+
+def route_colors(count, first=1):
+    """RGBA rows for `count` edges, the first being edge number `first`."""
+    return _PALETTE_RGBA[np.arange(first, first + count) % len(PALETTE)]
+
+
+def route_collection(ax, segments, colors):
+    """Add one line collection for `segments`, in 3D when the axes are 3D."""
+    style = dict(colors=colors, capstyle='projecting', joinstyle='round')
+    if ax.name == '3d' and segments.shape[-1] == 3:
+        lines = Line3DCollection(segments, **style)
+        ax.add_collection3d(lines)
+    else:
+        lines = LineCollection(segments[..., :2], **style)
+        ax.add_collection(lines)
+    return lines
+
+
+def draw_route(ax, path, dx=0, dy=0, limit=None):
+    """Draw a route's edges and white city markers with one artist each.
+
+    Looks like the per-edge `ax.plot` loops it replaces, at a cost of one
+    collection instead of one Line2D per edge.
+    """
+    pts = route_coords(path, limit)
+    if not len(pts):
+        return None
+    lines = None
+    if len(pts) > 1:
+        lines = route_collection(ax, route_segments(pts, dx, dy), route_colors(len(pts) - 1))
+    if ax.name == '3d' and pts.shape[1] == 3:
+        ax.scatter(pts[:, 0] + dx, pts[:, 1] + dy, pts[:, 2], c='white', s=5)
+    else:
+        ax.scatter(pts[:, 0] + dx, pts[:, 1] + dy, c='white', s=5)
+    ax.autoscale_view()
+    return lines
+
+
+def route_updater(ax, path, dx=0, dy=0, chunk=256):
+    """Frame function that grows a route in place; see route_animation.
+
+    `update(f)` shows cities 0..f and the edges between them, like
+    redrawing `path[:f + 1]`, and returns the artists it changed. Frames
+    may be skipped but must not go backwards. The view is fixed to the
+    whole route.
+    """
+    pts = route_coords(path)
+    m = len(pts)
+    three_d = ax.name == '3d' and pts.shape[1] == 3
+    segments = route_segments(pts, dx, dy) if m > 1 else np.empty((0, 2, pts.shape[1]))
+    colors = route_colors(len(segments))
+    xy = pts[:, :2] + (dx, dy)
+
+    if three_d:
+        cities = ax.scatter(xy[:1, 0], xy[:1, 1], pts[:1, 2], c='white', s=5)
+    else:
+        cities = ax.scatter(xy[:1, 0], xy[:1, 1], c='white', s=5)
+    # Fix the view on the whole route, as draw_route ends up. This comes
+    # after the first artist, whose autoscale would reset 3D data limits
+    if m and three_d:
+        ax.auto_scale_xyz(xy[:, 0], xy[:, 1], pts[:, 2])
+    elif m:
+        ax.update_datalim(xy)
+        ax.autoscale_view()
+    chunks = []
+
+    def update(frame):
+        edges = min(frame, len(segments))
+        while len(chunks) * chunk < edges:
+            if chunks:
+                # Complete the previous chunk in case frames were skipped
+                start = (len(chunks) - 1) * chunk
+                chunks[-1].set_segments(segments[start:start + chunk])
+                chunks[-1].set_color(colors[start:start + chunk])
+            start = len(chunks) * chunk
+            chunks.append(route_collection(ax, segments[start:start + 1], colors[start:start + 1]))
+        if chunks:
+            start = (len(chunks) - 1) * chunk
+            chunks[-1].set_segments(segments[start:edges])
+            chunks[-1].set_color(colors[start:edges])
+        cities.set_offsets(xy[:frame + 1])
+        if three_d:
+            cities.set_3d_properties(pts[:frame + 1, 2], 'z')
+        return chunks + [cities]
+
+    return update
+
+
+def route_animation(fig, ax, path, dx=0, dy=0, interval=1, chunk=256, **kwargs):
+    """Animate a route by extending its artists instead of redrawing them.
+
+    Frame f shows cities 0..f and the edges between them, like redrawing
+    `path[:f + 1]` each frame. Segments and colours are built once; each
+    frame only moves the end of a slice. Edges go into line collections of
+    `chunk` edges, and only the newest is updated, because
+    `set_segments` rebuilds a path per segment. That keeps the Python work
+    per frame constant. 2D axes are blitted. The view is fixed to the
+    whole route.
+    """
+    from matplotlib.animation import FuncAnimation
+
+    update = route_updater(ax, path, dx, dy, chunk)
+    kwargs.setdefault('repeat', False)
+    return FuncAnimation(fig, update, frames=len(path), interval=interval, blit=ax.name != '3d', **kwargs)
+
+
+class RouteView:
+    """A route indexed for drawing one window of it at a time.
+
+    `draw` asks a SegmentIndex for the edges in the window, so zoomed in
+    the cost follows what is on screen rather than the route length.
+    Zoomed out, when more than `max_segments` edges are in view, the
+    route is decimated: every k-th city is kept and joined in route order,
+    with k doubled until the view fits. Culling is on x/y only.
+    """
+
+    def __init__(self, path, max_segments=10000):
+        self.pts = route_coords(path)
+        self.max_segments = max_segments
+        xy = self.pts[:, :2]
+        self.index = SegmentIndex(xy[:-1], xy[1:]) if len(xy) > 1 else None
+
+    def __len__(self):
+        return len(self.pts)
+
+    def bounds(self, margin=0.05):
+        """Full-route x and y limits with matplotlib's default margins."""
+        lo, hi = self.pts[:, :2].min(axis=0), self.pts[:, :2].max(axis=0)
+        pad = np.where(hi > lo, (hi - lo) * margin, 0.5)
+        return (lo[0] - pad[0], hi[0] + pad[0]), (lo[1] - pad[1], hi[1] + pad[1])
+
+    def visible(self, xlim, ylim):
+        """Start and end city of each edge to draw, and its palette number."""
+        edges = self.index.query(xlim[0], xlim[1], ylim[0], ylim[1])
+        if len(edges) <= self.max_segments:
+            return edges, edges + 1, edges + 1
+        k = -(-len(edges) // self.max_segments)
+        while True:
+            blocks = np.unique(edges // k)
+            if len(blocks) <= self.max_segments:
+                break
+            k *= 2
+        start = blocks * k
+        return start, np.minimum(start + k, len(self.pts) - 1), blocks + 1
+
+    def draw(self, ax, xlim=None, ylim=None):
+        """Draw the part of the route inside xlim/ylim and fix the view there."""
+        if not len(self.pts):
+            return None
+        if xlim is None or ylim is None:
+            xlim, ylim = self.bounds()
+        three_d = ax.name == '3d' and self.pts.shape[1] == 3
+        lines = None
+        cities = np.zeros(1, dtype=np.intp)
+        if self.index is not None:
+            a, b, number = self.visible(xlim, ylim)
+            if len(a):
+                segments = np.stack((self.pts[a], self.pts[b]), axis=1)
+                lines = route_collection(ax, segments, _PALETTE_RGBA[number % len(PALETTE)])
+            cities = np.unique(np.concatenate((a, b)))
+        pts = self.pts[cities]
+        if three_d:
+            ax.scatter(pts[:, 0], pts[:, 1], pts[:, 2], c='white', s=5)
+        else:
+            ax.scatter(pts[:, 0], pts[:, 1], c='white', s=5)
+        ax.set_xlim(xlim)
+        ax.set_ylim(ylim)
+        return lines
+
+
+def zoom_limits(ax, x, y, factor):
+    """x and y limits after zooming in by `factor` around (x, y).
+
+    A factor below 1 zooms out. On 3D axes, or without a data position,
+    the zoom is about the centre of the view.
+    """
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    if ax.name == '3d' or x is None or y is None:
+        x, y = (x0 + x1) / 2, (y0 + y1) / 2
+    return ((x - (x - x0) / factor, x + (x1 - x) / factor),
+            (y - (y - y0) / factor, y + (y1 - y) / factor))
+
+
+def _clip(a, b, width, height):
+    """Liang-Barsky clip of segments a-b to [0, width] x [0, height].
+
+    Returns the clipped endpoints of the segments that meet the box.
+    """
+    d = b - a
+    t0 = np.zeros(len(a))
+    t1 = np.ones(len(a))
+    keep = np.ones(len(a), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-d[:, 0], a[:, 0]), (d[:, 0], width - a[:, 0]),
+                     (-d[:, 1], a[:, 1]), (d[:, 1], height - a[:, 1])):
+            t = q / p
+            keep &= (p != 0) | (q >= 0)
+            t0 = np.where(p < 0, np.maximum(t0, t), t0)
+            t1 = np.where(p > 0, np.minimum(t1, t), t1)
+    keep &= t0 <= t1
+    a, d, t0, t1 = a[keep], d[keep], t0[keep, None], t1[keep, None]
+    return a + d * t0, a + d * t1
+
+
+def rasterize(a, b, xlim, ylim, width, height, samples=1, max_samples=1 << 22):
+    """Count how often segments a-b cross each pixel of a window.
+
+    The window xlim x ylim maps onto a (height, width) grid, row 0 at the
+    bottom. Segments are clipped to it and sampled `samples` times per
+    pixel along their longer axis, at the midpoints of equal steps (a DDA
+    line, so a pixel column or row is hit once per segment at
+    samples=1), in batches of at most
+    `max_samples` points. Returns float counts per pixel.
+    """
+    a = np.asarray(a, dtype=np.float64)[:, :2]
+    b = np.asarray(b, dtype=np.float64)[:, :2]
+    scale = np.array([width / (xlim[1] - xlim[0]), height / (ylim[1] - ylim[0])])
+    origin = np.array([xlim[0], ylim[0]])
+    a, b = (a - origin) * scale, (b - origin) * scale
+    # Only segments leaving the window need clipping
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    inside = (lo[:, 0] >= 0) & (lo[:, 1] >= 0) & (hi[:, 0] <= width) & (hi[:, 1] <= height)
+    if not inside.all():
+        ca, cb = _clip(a[~inside], b[~inside], width, height)
+        a, b = np.concatenate((a[inside], ca)), np.concatenate((b[inside], cb))
+    steps = np.maximum(np.ceil(np.abs(b - a).max(axis=1) * samples), 1).astype(np.int64)
+    counts = np.zeros(width * height)
+
+    def accumulate(x, y):
+        ix = np.minimum(x.astype(np.int64), width - 1)
+        iy = np.minimum(y.astype(np.int64), height - 1)
+        np.add(counts, np.bincount(iy * width + ix, minlength=width * height), out=counts)
+
+    # Zoomed out most segments are a single sample: their midpoint
+    single = steps == 1
+    accumulate((a[single, 0] + b[single, 0]) / 2, (a[single, 1] + b[single, 1]) / 2)
+    a, b, steps = a[~single], b[~single], steps[~single]
+    ends = np.cumsum(steps)
+    lo = 0
+    while lo < len(a):
+        # Segments up to a batch of sample points (at least one segment)
+        hi = max(lo + 1, int(np.searchsorted(ends, ends[lo] - steps[lo] + max_samples, 'right')))
+        n = steps[lo:hi]
+        seg = np.repeat(np.arange(lo, hi), n)
+        k = np.arange(len(seg)) - np.repeat(np.cumsum(n) - n, n)
+        t = (k + 0.5) / n.repeat(n)
+        d = b[seg] - a[seg]
+        accumulate(a[seg, 0] + d[:, 0] * t, a[seg, 1] + d[:, 1] * t)
+        lo = hi
+    return (counts / samples).reshape(height, width)
+
+
+class DensityView(RouteView):
+    """A RouteView drawn as a log-scaled edge density image.
+
+    For routes with millions of edges, where even one line collection is
+    slow: the edges in the window (from the same SegmentIndex) are
+    rasterized at the axes' pixel size and shown with `imshow`. Every
+    `draw` re-rasterizes just its window, so zooming in sharpens the
+    image. 3D axes fall back to RouteView's lines.
+    """
+
+    def __init__(self, path, samples=1, cmap='inferno'):
+        super().__init__(path)
+        self.samples = samples
+        self.cmap = cmap
+
+    def image(self, xlim, ylim, width, height):
+        """Log-scaled density in [0, 1] over the window, row 0 at the bottom."""
+        counts = np.zeros((height, width))
+        if self.index is not None:
+            edges = self.index.query(xlim[0], xlim[1], ylim[0], ylim[1])
+            xy = self.pts[:, :2]
+            if len(edges) == len(xy) - 1:
+                a, b = xy[:-1], xy[1:]
+            else:
+                a, b = xy[edges], xy[edges + 1]
+            counts = rasterize(a, b, xlim, ylim, width, height, self.samples)
+        counts = np.log1p(counts)
+        top = counts.max()
+        return counts / top if top > 0 else counts
+
+    def draw(self, ax, xlim=None, ylim=None):
+        """Draw the window's density image and fix the view there."""
+        if ax.name == '3d' or not len(self.pts):
+            return super().draw(ax, xlim, ylim)
+        if xlim is None or ylim is None:
+            xlim, ylim = self.bounds()
+        box = ax.get_window_extent()
+        width, height = max(1, int(round(box.width))), max(1, int(round(box.height)))
+        image = ax.imshow(self.image(xlim, ylim, width, height), cmap=self.cmap, vmin=0, vmax=1,
+                          origin='lower', extent=(xlim[0], xlim[1], ylim[0], ylim[1]),
+                          aspect='auto', interpolation='nearest')
+        ax.set_xlim(xlim)
+        ax.set_ylim(ylim)
+        return image
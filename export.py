@@ -0,0 +1,148 @@
+import argparse
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from parallel import SharedCities, attach
+from readers import read_cities
+import solvers
+
+# Headless export of route animations. Frames are rasterized with the Agg
+# canvas directly (no pyplot, no display), split across worker processes
+# that attach to the route's coordinates in shared memory, and then
+# encoded locally with ffmpeg or Pillow when either is available.
+
+FRAME_NAME = 'frame_%06d.png'
+
+
+def _render_frames(handle, frames, out_dir, figsize, dpi):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from drawing import route_updater
+
+    pts = attach(handle).coords()
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d' if pts.shape[1] == 3 else 'rectilinear')
+    # Same styling as the scripts' render()
+    ax.set_facecolor('black')
+    ax.set_xticks([])
+    ax.set_yticks([])
+    update = route_updater(ax, pts)
+    for frame in frames:
+        update(frame)
+        fig.savefig(os.path.join(out_dir, FRAME_NAME % frame))
+    return len(frames)
+
+
+def export_frames(ca, tour, out_dir, step=1, workers=None, figsize=(6.4, 4.8), dpi=100):
+    """Write PNG frames of `tour` growing over `ca` into `out_dir`.
+
+    Frame f shows the first f + 1 cities of the tour, for every `step`-th
+    f plus the last. Workers take interleaved frames, so each gets a share
+    of the late, busier ones, and grow their own figure from frame to
+    frame. Returns the frame file paths in order.
+    """
+    tour = np.asarray(tour, dtype=np.intp)
+    route = ca.take(tour)
+    frames = list(range(0, len(tour), step))
+    if frames and frames[-1] != len(tour) - 1:
+        frames.append(len(tour) - 1)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(frames)))
+    with SharedCities(route) as shared:
+        if workers == 1:
+            _render_frames(shared.handle, frames, out_dir, figsize, dpi)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(_render_frames, shared.handle, frames[w::workers], out_dir, figsize, dpi)
+                           for w in range(workers)]
+                for future in futures:
+                    future.result()
+    return [os.path.join(out_dir, FRAME_NAME % f) for f in frames]
+
+
+def encode(frames, out, fps=30):
+    """Encode the PNG files `frames`, in order, to `out` (.mp4, .gif, ...).
+
+    Uses ffmpeg when it is on PATH, else (or when ffmpeg fails) Pillow for
+    GIFs. Returns `out`, or None when no encoder can write it.
+    """
+    if not frames:
+        return None
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        listing = os.path.join(os.path.dirname(os.path.abspath(frames[0])), 'frames.txt')
+        with open(listing, 'w') as f:
+            for path in frames:
+                quoted = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{quoted}'\nduration {1 / fps}\n")
+        cmd = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', listing]
+        if not out.lower().endswith('.gif'):
+            # Even dimensions for yuv420p, which players expect
+            cmd += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p']
+        try:
+            subprocess.run(cmd + [out], check=True)
+            return out
+        except subprocess.CalledProcessError:
+            pass  # e.g. a build without the codec; try Pillow or keep the frames
+        finally:
+            os.remove(listing)
+    if out.lower().endswith('.gif'):
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        images = (Image.open(path).convert('RGB') for path in frames)
+        first = next(images)
+        first.save(out, save_all=True, append_images=images, duration=1000 / fps, loop=0)
+        return out
+    return None
+
+
+def export(ca, tour, out, fps=30, step=1, workers=None, keep_frames=False, **options):
+    """Render `tour` to a video or GIF at `out`, or to a frame directory.
+
+    Frames go to `<out without extension>_frames`. They are removed after
+    a successful encode unless `keep_frames`; without a working encoder
+    they are the result. Only this export's frames are encoded, whatever
+    else is in the directory. `options` go to export_frames. Returns the path written.
+    """
+    root, ext = os.path.splitext(out)
+    frame_dir = root + '_frames' if ext else out
+    frames = export_frames(ca, tour, frame_dir, step, workers, **options)
+    if ext and encode(frames, out, fps):
+        if not keep_frames:
+            shutil.rmtree(frame_dir)
+        return out
+    return frame_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a route animation without a display.')
+    parser.add_argument('cities', help='city file (.csv or .jsonl)')
+    parser.add_argument('out', help='output .mp4/.gif, or a directory for PNG frames only')
+    parser.add_argument('--solver', default='morton_nearest_neighbour', help='constructor in solvers.py')
+    parser.add_argument('--fps', type=int, default=30, help='frames per second of the video')
+    parser.add_argument('--step', type=int, default=1, help='cities added per frame')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--dpi', type=int, default=100, help='frame resolution')
+    parser.add_argument('--keep-frames', action='store_true', help='keep the PNG frames after encoding')
+    args = parser.parse_args(argv)
+
+    ca = read_cities(args.cities)
+    tour = getattr(solvers, args.solver)(ca)
+    tour = np.append(tour, tour[:1])  # Complete the loop
+    written = export(ca, tour, args.out, args.fps, args.step, args.workers,
+                     args.keep_frames, dpi=args.dpi)
+    if written != args.out and os.path.splitext(args.out)[1]:
+        print(f'Could not encode {args.out}; frames are in {written}')
+    else:
+        print(f'Wrote {written}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from spatial import neighbour_lists
+
+# Local search stages that polish a tour from any constructor in
+# solvers.py. Each takes a CityArray and an index-array tour (the return
+# to the start is implied; a closed tour with the start repeated at the
+# end is accepted too) and returns the improved tour and the total
+# length saved.
+
+EPS = 1e-10
+
+
+def _prepare(ca, tour, k, neighbours):
+    tour = np.array(tour, dtype=np.intp)
+    if len(tour) > 1 and tour[0] == tour[-1]:
+        tour = tour[:-1]
+    n = len(tour)
+    pos = np.empty(n, dtype=np.intp)
+    pos[tour] = np.arange(n)
+    if neighbours is None:
+        neighbours = neighbour_lists(ca.coords(), k)
+    pts = [tuple(p) for p in ca.coords().tolist()]
+    return tour, pos, neighbours.tolist(), pts
+
+
+def _reverse(tour, pos, i, j):
+    """Reverse tour positions i..j (inclusive, wrapping), shorter side first."""
+    n = len(tour)
+    inner = (j - i) % n + 1
+    if 2 * inner > n:
+        i, j = (j + 1) % n, (i - 1) % n
+        inner = n - inner
+    if inner < 2:
+        return
+    if i + inner <= n:
+        seg = tour[i:i + inner][::-1].copy()
+        tour[i:i + inner] = seg
+        pos[seg] = np.arange(i, i + inner)
+    else:
+        idx = (i + np.arange(inner)) % n
+        seg = tour[idx][::-1]
+        tour[idx] = seg
+        pos[seg] = idx
+
+
+def _swap_edges(tour, pos, a, b, c, d):
+    """Replace tour edges a-b and c-d with a-c and b-d (a 2-opt move)."""
+    n = len(tour)
+    if tour[(pos[a] + 1) % n] != b:
+        a, b, c, d = b, a, d, c
+    _reverse(tour, pos, pos[b], pos[c])
+
+
+def two_opt(ca, tour, k=8, neighbours=None):
+    """2-opt restricted to each city's k nearest neighbours.
+
+    Cities whose neighbourhood produced no improving move get their
+    don't-look bit set and are only revisited when one of their tour edges
+    changes, so the pass runs in near-linear time.
+    """
+    tour, pos, neigh, pts = _prepare(ca, tour, k, neighbours)
+    n = len(tour)
+    if n < 4:
+        return tour, 0.0
+    dist = math.dist
+    queue = deque(tour.tolist())
+    queued = [True] * n
+    total = 0.0
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        improved = False
+        for forward in (True, False):
+            pa = pos[a]
+            b = tour[(pa + 1) % n] if forward else tour[pa - 1]
+            d_ab = dist(pts[a], pts[b])
+            for c in neigh[a]:
+                g = d_ab - dist(pts[a], pts[c])
+                if g <= EPS:
+                    break
+                pc = pos[c]
+                d = tour[(pc + 1) % n] if forward else tour[pc - 1]
+                if c == b or d == a:
+                    continue
+                gain = g + dist(pts[c], pts[d]) - dist(pts[b], pts[d])
+                if gain > EPS:
+                    # New edges (a, c) and (b, d)
+                    if forward:
+                        _reverse(tour, pos, pos[b], pc)
+                    else:
+                        _reverse(tour, pos, pa, pos[d])
+                    total += gain
+                    for city in (a, b, c, d):
+                        if not queued[city]:
+                            queued[city] = True
+                            queue.append(city)
+                    improved = True
+                    break
+            if improved:
+                break
+    return tour, total
+
+
+def or_opt(ca, tour, k=8, neighbours=None, max_length=3):
+    """Or-opt: move runs of 1..max_length cities next to a near neighbour.
+
+    Each run is tried at both of its ends against the k nearest neighbours
+    of that end, in either orientation. The tour-position array makes
+    every gain an O(1) lookup; an accepted move is applied as two or three
+    2-opt reversals. Uses don't-look bits like two_opt.
+    """
+    tour, pos, neigh, pts = _prepare(ca, tour, k, neighbours)
+    n = len(tour)
+    if n < 5:
+        return tour, 0.0
+    dist = math.dist
+    max_length = max(1, min(max_length, n - 3))
+    queue = deque(tour.tolist())
+    queued = [True] * n
+    total = 0.0
+
+    def succ(city):
+        return tour[(pos[city] + 1) % n]
+
+    def pred(city):
+        return tour[pos[city] - 1]
+
+    def best_move(a):
+        pa = pos[a]
+        for length in range(1, max_length + 1):
+            for first in ((pa,) if length == 1 else (pa, pa - length + 1)):
+                seg = [tour[(first + t) % n] for t in range(length)]
+                s1, s2 = seg[0], seg[-1]
+                p, nx = pred(s1), succ(s2)
+                removed = dist(pts[p], pts[s1]) + dist(pts[s2], pts[nx]) - dist(pts[p], pts[nx])
+                if removed <= EPS:
+                    continue
+                for end in (s1, s2):
+                    other = s2 if end == s1 else s1
+                    for c in neigh[end]:
+                        d_ce = dist(pts[c], pts[end])
+                        if d_ce >= removed:
+                            break
+                        if c in seg:
+                            continue
+                        # Insert with `end` next to c, on either side of c
+                        for left, right in ((c, succ(c)), (pred(c), c)):
+                            if right in seg or left in seg or left == nx or right == p:
+                                continue
+                            if left == c:
+                                added = d_ce + dist(pts[other], pts[right])
+                            else:
+                                added = dist(pts[left], pts[other]) + d_ce
+                            gain = removed - added + dist(pts[left], pts[right])
+                            if gain > EPS:
+                                # True when the run lands as left-s2 .. s1-right
+                                reversed_run = (left == c) == (end == s2)
+                                return gain, (p, s1, s2, nx, left, right, reversed_run)
+        return 0.0, None
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        gain, move = best_move(a)
+        if move is None:
+            continue
+        p, s1, s2, nx, c, d, reversed_run = move
+        # Reversed insertion (c-s2 .. s1-d), then flip the run if needed
+        _swap_edges(tour, pos, p, s1, c, d)
+        _swap_edges(tour, pos, p, c, nx, s2)
+        if not reversed_run and s1 != s2:
+            _swap_edges(tour, pos, c, s2, s1, d)
+        total += gain
+        for city in (a, p, s1, s2, nx, c, d):
+            if not queued[city]:
+                queued[city] = True
+                queue.append(city)
+    return tour, total
+
+
+def two_opt_path(pts, path):
+    """2-opt on an open sub-path with both end cities fixed.
+
+    `pts` is the coordinate array that `path` indexes. All reversals of
+    the window are scored at once with NumPy and the best one applied
+    until none helps. Returns the improved path and the gain.
+    """
+    path = path.copy()
+    total = 0.0
+    m = len(path)
+    if m < 4:
+        return path, total
+    i, j = np.triu_indices(m - 1, k=1)
+    i, j = i[i > 0], j[i > 0]
+    while True:
+        p = pts[path]
+        d = np.sqrt(((p[:-1] - p[1:]) ** 2).sum(axis=1))
+        # Reversing path[i..j] swaps edges (i-1, i), (j, j+1) for (i-1, j), (i, j+1)
+        gain = (d[i - 1] + d[j]
+                - np.sqrt(((p[i - 1] - p[j]) ** 2).sum(axis=1))
+                - np.sqrt(((p[i] - p[j + 1]) ** 2).sum(axis=1)))
+        best = int(np.argmax(gain))
+        if gain[best] <= EPS:
+            return path, total
+        a, b = i[best], j[best]
+        path[a:b + 1] = path[a:b + 1][::-1]
+        total += float(gain[best])
+
+
+def lin_kernighan(ca, tour, k=6, depth=5, breadth=(5, 3), time_limit=None,
+                  neighbours=None, seed=None):
+    """Lin-Kernighan style variable-depth search, chained with kicks.
+
+    Each step breaks a tour edge at t1 and extends a chain of up to
+    `depth` 2-opt flips, with t3 drawn from the k nearest neighbours of
+    the chain end. The best `breadth[level]` choices are backtracked over
+    at the first levels (one beyond), and the best closed tour seen along
+    the chain is kept.
+    Once no city improves, and if `time_limit` seconds are given, the
+    search keeps applying random local double-bridge kicks, re-optimizes
+    around them and keeps the result only if the tour got shorter.
+    """
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    tour, pos, neigh, pts = _prepare(ca, tour, k, neighbours)
+    n = len(tour)
+    if n < 5:
+        return tour, 0.0
+    dist = math.dist
+
+    def succ(city):
+        return tour[(pos[city] + 1) % n]
+
+    def pred(city):
+        return tour[pos[city] - 1]
+
+    def undo(flips):
+        for a, b, c, d in reversed(flips):
+            _swap_edges(tour, pos, a, c, b, d)
+
+    def extend(t1, cur, gain, level, added):
+        """Best closed gain reachable from chain end `cur`, or 0.
+
+        On success the tour is left in that state and the applied flips
+        are returned; otherwise the tour is unchanged.
+        """
+        if level == depth:
+            return 0.0, []
+        # t4 sits on the same side of t3 as t1 does of the chain end
+        forward = succ(cur) == t1
+        options = []
+        for t3 in neigh[cur]:
+            g1 = gain - dist(pts[cur], pts[t3])
+            if g1 <= EPS:
+                break
+            if t3 == t1:
+                continue
+            t4 = succ(t3) if forward else pred(t3)
+            if t4 == cur or (min(t3, t4), max(t3, t4)) in added:
+                continue
+            options.append((g1 + dist(pts[t3], pts[t4]), t3, t4))
+        options.sort(reverse=True)
+        for g2, t3, t4 in options[:breadth[level] if level < len(breadth) else 1]:
+            flip = (cur, t1, t3, t4)
+            _swap_edges(tour, pos, *flip)
+            edge = (min(cur, t3), max(cur, t3))
+            added.add(edge)
+            closed = g2 - dist(pts[t4], pts[t1])
+            deeper, flips = extend(t1, t4, g2, level + 1, added)
+            added.discard(edge)
+            if deeper > max(closed, 0.0) + EPS:
+                return deeper, [flip] + flips
+            undo(flips)
+            if closed > EPS:
+                return closed, [flip]
+            undo([flip])
+        return 0.0, []
+
+    def improve_from(t1, journal):
+        for t2 in (succ(t1), pred(t1)):
+            gain, flips = extend(t1, t2, dist(pts[t1], pts[t2]), 0, set())
+            if flips:
+                journal.extend(flips)
+                return gain, [city for flip in flips for city in flip]
+        return 0.0, ()
+
+    def optimize(cities, journal):
+        queue = deque(cities)
+        queued = set(cities)
+        total = 0.0
+        while queue:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            t1 = queue.popleft()
+            queued.discard(t1)
+            gain, touched = improve_from(t1, journal)
+            if gain:
+                total += gain
+                for city in touched:
+                    if city not in queued:
+                        queued.add(city)
+                        queue.append(city)
+        return total
+
+    def rotate(i, l1, l2):
+        # A [B C] D -> A [C B] D on positions i+1 .. i+l1+l2
+        idx = (i + 1 + np.arange(l1 + l2)) % n
+        seg = tour[idx]
+        seg = np.concatenate((seg[l1:], seg[:l1]))
+        tour[idx] = seg
+        pos[seg] = idx
+
+    total = optimize(tour.tolist(), [])
+    if deadline is None or n < 8:
+        return tour, total
+
+    rng = np.random.default_rng(seed)
+    span = max(2, min(50, (n - 2) // 2))
+    while time.perf_counter() < deadline:
+        i = int(rng.integers(n))
+        l1, l2 = (int(v) for v in rng.integers(1, span + 1, size=2))
+        a, b0, b1 = tour[i], tour[(i + 1) % n], tour[(i + l1) % n]
+        c0, c1, d = tour[(i + l1 + 1) % n], tour[(i + l1 + l2) % n], tour[(i + l1 + l2 + 1) % n]
+        delta = (dist(pts[a], pts[b0]) + dist(pts[b1], pts[c0]) + dist(pts[c1], pts[d])
+                 - dist(pts[a], pts[c0]) - dist(pts[c1], pts[b0]) - dist(pts[b1], pts[d]))
+        rotate(i, l1, l2)
+        journal = []
+        delta += optimize([a, b0, b1, c0, c1, d], journal)
+        if delta > EPS:
+            total += delta
+            continue
+        for a_, b_, c_, d_ in reversed(journal):
+            _swap_edges(tour, pos, a_, c_, b_, d_)
+        # Undoing the flips can leave the tour running the other way
+        if succ(a) == c0:
+            rotate(pos[a], l2, l1)
+        else:
+            rotate(pos[d], l1, l2)
+    return tour, total
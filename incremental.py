@@ -0,0 +1,188 @@
+import math
+
+import numpy as np
+
+from cityarray import tour_length
+from improve import two_opt_path
+from spatial import SegmentGrid
+
+# Small edits to a solved tour without re-solving it. The tour is held as
+# a doubly linked list with a grid of its edges: a new city goes into the
+# cheapest nearby edge, a removed city is spliced out, and a fixed-end
+# 2-opt repairs a short stretch of tour around each edit.
+
+
+class TourEditor:
+    """A solved tour open for city insertions and removals.
+
+    `ca` holds every city that may appear; `tour` is an index array over
+    some of them (the return to the start is implied). Edits touch only
+    the cities around them, so they cost milliseconds on large tours;
+    `order()` walks the whole tour once to export it.
+    """
+
+    def __init__(self, ca, tour, window=20):
+        tour = np.asarray(tour, dtype=np.intp)
+        if len(tour) > 1 and tour[0] == tour[-1]:
+            tour = tour[:-1]
+        self.pts = ca.coords()
+        self._xy = [tuple(p) for p in self.pts.tolist()]
+        self.window = window
+        n = len(ca)
+        self.succ = [-1] * n
+        self.pred = [-1] * n
+        order = tour.tolist()
+        for a, b in zip(order, order[1:] + order[:1]):
+            self.succ[a] = b
+            self.pred[b] = a
+        self.size = len(order)
+        self.start = order[0] if order else -1
+
+        # Cells about one mean edge long keep each edge in a cell or two
+        mean_edge = tour_length(ca, tour) / len(order) if len(order) > 1 else 0.0
+        self.edges = SegmentGrid(mean_edge)
+        self._lo = self.pts[:, :2].min(axis=0).tolist() if n else [0.0, 0.0]
+        self._hi = self.pts[:, :2].max(axis=0).tolist() if n else [0.0, 0.0]
+        for a in order if len(order) > 1 else ():
+            self._add_edge(a, self.succ[a])
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, city):
+        return self.succ[city] != -1
+
+    def _add_edge(self, a, b):
+        self.edges.add(self._xy[a], self._xy[b], a, b)
+
+    def _is_edge(self, a, b):
+        # Grid entries are never deleted; an entry counts while it is
+        # still a tour edge in either direction
+        return a != b and (self.succ[a] == b or self.succ[b] == a)
+
+    def _cheapest_edge(self, c):
+        """Tour edge (a, b) whose replacement by a-c-b costs least.
+
+        Grid rings are searched outwards from c until some edge turns up,
+        then one ring further; only edges near c are considered.
+        """
+        p = self._xy[c]
+        dist, xy = math.dist, self._xy
+        best = None
+        best_cost = float('inf')
+        seen = set()
+        stop = None
+        ring = 0
+        # Beyond this many rings the search has covered every city
+        reach = max(abs(p[0] - self._lo[0]), abs(p[0] - self._hi[0]),
+                    abs(p[1] - self._lo[1]), abs(p[1] - self._hi[1]))
+        span = int(reach // self.edges.cell_size) + 2
+        while stop is None or ring <= stop:
+            for seg in self.edges.near(p, ring):
+                a, b = self.edges.ends(seg)
+                if seg in seen or not self._is_edge(a, b):
+                    continue
+                seen.add(seg)
+                cost = dist(xy[a], p) + dist(p, xy[b]) - dist(xy[a], xy[b])
+                if cost < best_cost:
+                    best_cost, best = cost, (a, b)
+            if best is not None and stop is None:
+                stop = ring + 1
+            ring += 1
+            if ring > span:
+                break
+        return best
+
+    def _repair(self, city):
+        # Fixed-end 2-opt over up to `window` cities either side of `city`
+        w = min(self.window, (self.size - 2) // 2)
+        if w < 2:
+            return 0.0
+        path = [city]
+        for _ in range(w):
+            path.insert(0, self.pred[path[0]])
+            path.append(self.succ[path[-1]])
+        path = np.array(path, dtype=np.intp)
+        new, gain = two_opt_path(self.pts, path)
+        if not gain:
+            return 0.0
+        old = set(zip(path.tolist(), path[1:].tolist()))
+        new = new.tolist()
+        for a, b in zip(new, new[1:]):
+            self.succ[a] = b
+            self.pred[b] = a
+            if (a, b) not in old and (b, a) not in old:
+                self._add_edge(a, b)
+        return gain
+
+    def insert(self, cities):
+        """Insert cities of `ca` that are not on the tour. Returns the repair gain."""
+        touched = []
+        for c in np.asarray(cities, dtype=np.intp).reshape(-1).tolist():
+            if c in self:
+                continue
+            if self.size < 2:
+                other = self.start if self.size else c
+                self.succ[c], self.pred[c] = other, other
+                self.succ[other], self.pred[other] = c, c
+                if self.size:
+                    # First edge: size the grid cells from it
+                    self.edges = SegmentGrid(math.dist(self._xy[c], self._xy[other]))
+                    self._add_edge(other, c)
+                else:
+                    self.start = c
+                self.size += 1
+                continue
+            a, b = self._cheapest_edge(c)
+            if self.succ[a] != b:
+                a, b = b, a
+            self.succ[a], self.pred[c] = c, a
+            self.succ[c], self.pred[b] = b, c
+            self._add_edge(a, c)
+            self._add_edge(c, b)
+            self.size += 1
+            touched.append(c)
+        return sum(self._repair(c) for c in touched if c in self)
+
+    def remove(self, cities):
+        """Splice cities out of the tour. Returns the repair gain."""
+        touched = []
+        for c in np.asarray(cities, dtype=np.intp).reshape(-1).tolist():
+            if c not in self:
+                continue
+            a, b = self.pred[c], self.succ[c]
+            self.succ[c] = self.pred[c] = -1
+            self.size -= 1
+            if c == self.start:
+                self.start = b if self.size else -1
+            if not self.size:
+                continue
+            self.succ[a], self.pred[b] = b, a
+            if a != b:
+                self._add_edge(a, b)
+            touched.append(a)
+        return sum(self._repair(a) for a in touched if a in self)
+
+    def order(self):
+        """The current tour as an index array, from the original start city."""
+        out = np.empty(self.size, dtype=np.intp)
+        city = self.start
+        succ = self.succ
+        for i in range(self.size):
+            out[i] = city
+            city = succ[city]
+        return out
+
+
+def update_tour(ca, tour, added=(), removed=(), window=20):
+    """Apply one batch of edits to `tour`; see TourEditor.
+
+    `added` are indices into `ca` to put on the tour, `removed` indices to
+    take off. Returns the new tour and the gain of the local repairs.
+    Keep a TourEditor instead when editing the same tour repeatedly, as
+    building one indexes every tour edge.
+    """
+    editor = TourEditor(ca, tour, window)
+    gain = editor.remove(removed)
+    gain += editor.insert(added)
+    return editor.order(), gain
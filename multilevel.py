@@ -0,0 +1,100 @@
+import numpy as np
+
+from cityarray import CityArray
+import improve
+import solvers
+
+# Multilevel tour construction: merge nearby cities into super-nodes
+# level by level until the instance is small, solve that coarse instance,
+# then expand back one level at a time, refining the tour at each level.
+
+
+def coarsen(ca, ratio=4):
+    """Merge cities sharing a grid cell into one weighted super-node.
+
+    Cells are sized to hold about `ratio` cities. Returns the super-node
+    index of every city and the number of super-nodes.
+    """
+    n = len(ca)
+    pts = ca.coords()
+    lo = pts[:, :2].min(axis=0)
+    span = np.maximum(pts[:, :2].max(axis=0) - lo, 1e-12)
+    cell = float(np.sqrt(span[0] * span[1] * ratio / n)) or float(span.max())
+    while True:
+        cx = ((pts[:, 0] - lo[0]) // cell).astype(np.int64)
+        cy = ((pts[:, 1] - lo[1]) // cell).astype(np.int64)
+        _, parent = np.unique(cx * (int(cy.max()) + 1) + cy, return_inverse=True)
+        m = int(parent.max()) + 1
+        # Clustered data leaves most cells with one city; widen until the
+        # level actually shrinks
+        if m <= 0.75 * n or cell > 2 * span.max():
+            break
+        cell *= 1.5
+    return parent.reshape(-1), m
+
+
+def _levels(ca, coarse_size, ratio):
+    """Coarse CityArrays from finest to coarsest, with parents and weights."""
+    levels = [ca]
+    parents = []
+    weights = [np.ones(len(ca))]
+    while len(levels[-1]) > coarse_size:
+        fine, w = levels[-1], weights[-1]
+        parent, m = coarsen(fine, ratio)
+        total = np.bincount(parent, weights=w, minlength=m)
+        cols = [np.bincount(parent, weights=c * w, minlength=m) / total
+                for c in ([fine.x, fine.y] if fine.z is None else [fine.x, fine.y, fine.z])]
+        if m == len(fine):
+            break
+        levels.append(CityArray(*cols))
+        parents.append(parent)
+        weights.append(total)
+    return levels, parents
+
+
+def _expand(fine, coarse, tour, parent):
+    """Order the children of each super-node along the coarse tour.
+
+    Children are visited in coarse tour order; inside a super-node they
+    are sorted along the direction from the previous to the next super-node.
+    """
+    k = len(tour)
+    pos = np.empty(k, dtype=np.intp)
+    pos[tour] = np.arange(k)
+    centres = coarse.coords()
+    prev = centres[tour[(pos - 1) % k]]
+    nxt = centres[tour[(pos + 1) % k]]
+    direction = (nxt - prev)[parent]
+    along = ((fine.coords() - prev[parent]) * direction).sum(axis=1)
+    return np.lexsort((along, pos[parent]))
+
+
+def _refine(ca, tour, improvers):
+    total = 0.0
+    for name in improvers:
+        tour, gain = getattr(improve, name)(ca, tour)
+        total += gain
+    return tour, total
+
+
+def multilevel_solve(ca, coarse_size=1000, ratio=4, solver='greedy_edge',
+                     improver=('two_opt', 'or_opt')):
+    """Tour from coarsening, a coarse solve and level-by-level refinement.
+
+    Cities are merged by grid clustering (`coarsen`) until at most
+    `coarse_size` super-nodes are left, which `solvers.<solver>` solves.
+    Each level is refined with the stage(s) named by `improver` from
+    improve.py, in order (None to skip). Returns the tour and the
+    refinement gain on the finest level.
+    """
+    n = len(ca)
+    if n < 4:
+        return np.arange(n, dtype=np.intp), 0.0
+    improvers = (improver,) if isinstance(improver, str) else tuple(improver or ())
+    levels, parents = _levels(ca, coarse_size, ratio)
+    tour, gain = _refine(levels[-1], getattr(solvers, solver)(levels[-1]), improvers)
+    for level in range(len(parents) - 1, -1, -1):
+        fine = levels[level]
+        tour = _expand(fine, levels[level + 1], tour, parents[level])
+        tour, gain = _refine(fine, tour, improvers)
+    return tour, gain
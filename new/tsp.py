@@ -2,6 +2,12 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import matplotlib.colors as mcolors
 import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cityarray import CityArray
+import solvers
 
 # Draw cities and connecting lines
 def draw_cities(ax, sorted_path, offset_x=0, offset_y=0):
@@ -50,7 +56,7 @@ def zap(cities):
     if not cities:
         print("No cities to process.")
         return []
-    sorted_path = sorted(cities, key=lambda c: (c['x'], c['y']))
+    sorted_path = [cities[i] for i in solvers.zap(CityArray.from_dicts(cities))]
     sorted_path.append(sorted_path[0])  # close loop
     return sorted_path
 
@@ -0,0 +1,145 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cityarray import CityArray, tour_length
+import improve
+import solvers
+
+# Process-pool helpers. City coordinates are copied once into a shared
+# memory block; workers attach to it by name and only index arrays cross
+# the process boundary.
+
+
+class SharedCities:
+    """Coordinates of a CityArray published in shared memory.
+
+    Use as a context manager; `handle` is a small picklable tuple that
+    workers pass to `attach` to get read-only views of the columns.
+    """
+
+    def __init__(self, ca):
+        cols = [ca.x, ca.y] if ca.z is None else [ca.x, ca.y, ca.z]
+        shape = (len(cols), len(ca))
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * shape[0] * shape[1]))
+        view = np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf)
+        for row, col in zip(view, cols):
+            row[:] = col
+        self.handle = (self._shm.name, shape)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_attached = {}
+
+
+def attach(handle):
+    """Return a CityArray viewing the shared columns (cached per process).
+
+    The view holds no per-city ids or names, so a worker's `take` only
+    allocates its own slice.
+    """
+    name, shape = handle
+    if name not in _attached:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: workers share the parent's resource tracker, so
+            # the extra registration is harmless
+            shm = shared_memory.SharedMemory(name=name)
+        cols = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        cols.flags.writeable = False
+        _attached[name] = (shm, CityArray(cols[0], cols[1], cols[2] if len(cols) > 2 else None))
+    return _attached[name][1]
+
+
+def _solve(ca, solver, improver, options):
+    order = getattr(solvers, solver)(ca, **options)
+    if improver:
+        order = getattr(improve, improver)(ca, order)[0]
+    return order
+
+
+def _solve_group(handle, idx, solver, improver, options):
+    ca = attach(handle)
+    return idx[_solve(ca.take(idx), solver, improver, options)]
+
+
+def solve_groups(ca, groups, solver='connect', processes=None, improver=None, **options):
+    """Solve each group of city indices with `solvers.<solver>`.
+
+    `improver` optionally names a stage from improve.py to run on each
+    group's tour. Returns one tour (global index array) per group, in
+    group order. Groups run in a process pool, largest first for load
+    balance; a single group or `processes=1` runs in this process.
+    Workers only copy their own group's coordinates.
+    """
+    groups = [np.asarray(g, dtype=np.intp) for g in groups]
+    if processes == 1 or len(groups) < 2:
+        return [g[_solve(ca.take(g), solver, improver, options)] for g in groups]
+
+    processes = processes or os.cpu_count() or 1
+    results = [None] * len(groups)
+    with SharedCities(ca) as shared, ProcessPoolExecutor(processes) as pool:
+        by_size = sorted(range(len(groups)), key=lambda g: -len(groups[g]))
+        futures = {pool.submit(_solve_group, shared.handle, groups[g], solver, improver, options): g for g in by_size}
+        for future, g in futures.items():
+            results[g] = future.result()
+    return results
+
+
+def _nearest_from(handle, start, dim):
+    ca = attach(handle)
+    t0 = time.perf_counter()
+    order = solvers.nearest_neighbour(ca, start=start, dim=dim)
+    seconds = time.perf_counter() - t0
+    return order, tour_length(ca, order, dim=dim), seconds
+
+
+def multi_start_nearest_neighbour(ca, starts=8, seed=None, first=None, processes=None, dim=None):
+    """Nearest neighbour from several start cities at once; keep the shortest.
+
+    `starts` is either a count or an explicit list of start indices. A
+    count picks that many distinct cities with `np.random.default_rng(seed)`,
+    always including `first` when given. Returns the best tour and one
+    dict per start with its 'start', 'length' and 'seconds', in start order.
+    """
+    n = len(ca)
+    if not n:
+        return np.empty(0, dtype=np.intp), []
+    if np.isscalar(starts):
+        count = max(1, min(int(starts), n))
+        rng = np.random.default_rng(seed)
+        picks = rng.permutation(n).tolist()
+        if first is not None:
+            picks.remove(first)
+            picks.insert(0, first)
+        starts = picks[:count]
+    starts = [int(s) for s in starts]
+
+    if processes == 1 or len(starts) < 2:
+        results = []
+        for s in starts:
+            t0 = time.perf_counter()
+            order = solvers.nearest_neighbour(ca, start=s, dim=dim)
+            results.append((order, tour_length(ca, order, dim=dim), time.perf_counter() - t0))
+    else:
+        with SharedCities(ca) as shared, ProcessPoolExecutor(processes or os.cpu_count() or 1) as pool:
+            futures = [pool.submit(_nearest_from, shared.handle, s, dim) for s in starts]
+            results = [f.result() for f in futures]
+
+    runs = [{'start': s, 'length': length, 'seconds': seconds}
+            for s, (_, length, seconds) in zip(starts, results)]
+    best = min(range(len(results)), key=lambda r: (results[r][1], r))
+    return results[best][0], runs
@@ -0,0 +1,231 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+from cityarray import CityArray
+
+# Streaming readers for large city files. The file is read in byte
+# chunks cut at line ends and each chunk is parsed column-wise straight
+# into preallocated coordinate arrays; no per-row dicts are built.
+#
+# CSV:         a header naming the columns, e.g. name,x,y[,z]
+# JSON-lines:  one object per line, e.g. {"name": "A", "x": 1.0, "y": 2.0}
+#
+# Missing x/y/z values read as 0, like CityArray.from_dicts.
+
+CHUNK_BYTES = 1 << 24
+
+
+def _count_lines(path):
+    # Upper bound on the row count, used to size the arrays up front
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    return lines + (last != b'\n')
+
+
+def _chunks(f, chunk_bytes):
+    """Yield decoded text chunks of `f`, each ending on a line boundary."""
+    rest = b''
+    for block in iter(lambda: f.read(chunk_bytes), b''):
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        if not cut:
+            rest = block
+            continue
+        rest = block[cut:]
+        yield block[:cut].decode('utf-8')
+    if rest.strip():
+        yield rest.decode('utf-8')
+
+
+def _floats(values, dtype):
+    # Blank cells read as 0
+    try:
+        return np.array(values, dtype=dtype)
+    except ValueError:
+        return np.array([v if v.strip() else 0 for v in values], dtype=dtype)
+
+
+class _Columns:
+    """Preallocated x/y/z columns plus names, filled chunk by chunk."""
+
+    def __init__(self, rows, has_z, dtype):
+        self.x = np.zeros(rows, dtype=dtype)
+        self.y = np.zeros(rows, dtype=dtype)
+        self.z = np.zeros(rows, dtype=dtype) if has_z else None
+        self.names = []
+        self.dtype = dtype
+        self.n = 0
+
+    def put(self, count, x=None, y=None, z=None, names=None):
+        lo, hi = self.n, self.n + count
+        if hi > len(self.x):
+            raise ValueError('more rows than the line count')
+        for col, values in ((self.x, x), (self.y, y), (self.z, z)):
+            if col is not None and values is not None:
+                col[lo:hi] = _floats(values, self.dtype)
+        self.names.extend(names if names is not None else [None] * count)
+        self.n = hi
+
+    def finish(self):
+        n = self.n
+        z = None if self.z is None else self.z[:n]
+        return CityArray(self.x[:n], self.y[:n], z, names=self.names, dtype=self.dtype)
+
+
+def read_csv(path, dtype=np.float64, chunk_bytes=CHUNK_BYTES):
+    """Read a CSV file with a header row into a CityArray.
+
+    The x, y, optional z and name columns are located by header name;
+    other columns are skipped. Plain chunks are split with two string
+    operations; chunks with quotes or blank lines go through the csv module.
+    """
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8-sig')]), [])
+        header = [h.strip() for h in header]
+        if 'x' not in header or 'y' not in header:
+            raise ValueError(f'{path}: CSV header needs x and y columns')
+        width = len(header)
+        where = {key: header.index(key) for key in ('x', 'y', 'z', 'name') if key in header}
+        cols = _Columns(_count_lines(path), 'z' in where, dtype)
+
+        for text in _chunks(f, chunk_bytes):
+            text = text.rstrip('\n')
+            if '"' in text or '\r' in text or '\n\n' in text:
+                lines = [line for line in text.splitlines() if line.strip()]
+                rows = list(csv.reader(lines))
+                if any(len(row) != width for row in rows):
+                    raise ValueError(f'{path}: expected {width} fields per row')
+                count = len(rows)
+                cells = [cell for row in rows for cell in row]
+            elif text:
+                count = text.count('\n') + 1
+                cells = text.replace('\n', ',').split(',')
+                if len(cells) != width * count:
+                    raise ValueError(f'{path}: expected {width} fields per row')
+            else:
+                continue
+            picked = {key: cells[i::width] for key, i in where.items()}
+            if 'name' in picked:
+                picked['names'] = picked.pop('name')
+            cols.put(count, **picked)
+    return cols.finish()
+
+
+def _template(line):
+    """Split one JSON line into its literal skeleton around the values.
+
+    Returns the record's keys, the text pieces between their values and
+    which values are strings. String quotes are kept in the pieces, e.g.
+    ['{"name": "', '", "x": ', ', "y": ', '}'] for a typical line.
+    """
+    decoder = json.JSONDecoder()
+    record = json.loads(line)
+    keys = list(record)
+    pieces = []
+    strings = []
+    at = 0
+    for key in keys:
+        start = line.index(':', line.index(json.dumps(key), at)) + 1
+        while line[start] in ' \t':
+            start += 1
+        quoted = isinstance(record[key], str)
+        pieces.append(line[at:start + quoted])
+        strings.append(quoted)
+        at = decoder.raw_decode(line, start)[1]
+        at -= quoted
+    pieces.append(line[at:])
+    return keys, pieces, strings
+
+
+def _split(text, template, has_z):
+    """Cut a chunk whose lines all share the first line's skeleton.
+
+    The skeleton pieces are swapped for a separator with str.replace and
+    the chunk is split once, leaving the values at a fixed stride. Returns
+    the row count and fields, or None when any line deviates (other key
+    order or spacing, a null name, blank lines...), in which case the
+    chunk is parsed line by line.
+    """
+    keys, pieces, strings = template
+    text = text.rstrip('\n')
+    if not keys or '\0' in text or '\r' in text or '\n\n' in text:
+        return None
+    head, tail = pieces[0], pieces[-1]
+    if not (text.startswith(head) and text.endswith(tail)):
+        return None
+    count = text.count('\n') + 1
+    body = text[len(head):len(text) - len(tail)].replace(tail + '\n' + head, '\0')
+    for piece in pieces[1:-1]:
+        body = body.replace(piece, '\0')
+    values = body.split('\0')
+    stride = len(keys)
+    if len(values) != stride * count:
+        return None
+    out = {}
+    for key in ('x', 'y', 'z') if has_z else ('x', 'y'):
+        if key not in keys or strings[keys.index(key)]:
+            return None
+        out[key] = values[keys.index(key)::stride]
+    if 'name' in keys:
+        if not strings[keys.index('name')]:
+            return None
+        names = values[keys.index('name')::stride]
+        if '\\' in text:
+            names = [json.loads(f'"{v}"') if '\\' in v else v for v in names]
+        out['names'] = names
+    return count, out
+
+
+def _parse(lines, has_z):
+    # Slow path: one json.loads per line, values moved out immediately
+    records = [json.loads(line) for line in lines]
+    keys = ('x', 'y', 'z') if has_z else ('x', 'y')
+    out = {key: [str(r.get(key) or 0) for r in records] for key in keys}
+    out['names'] = [r.get('name') for r in records]
+    return out
+
+
+def read_jsonl(path, dtype=np.float64, chunk_bytes=CHUNK_BYTES):
+    """Read a JSON-lines file of city objects into a CityArray.
+
+    Whether the file has z is decided by its first record, as in
+    CityArray.from_dicts. Chunks whose lines all follow the first line's
+    layout are split without a JSON parse; others fall back to json.loads.
+    """
+    with open(path, 'rb') as f:
+        first = f.readline()
+        while first and not first.strip():
+            first = f.readline()
+        template = _template(first.decode('utf-8').strip()) if first.strip() else ([], [], [])
+        has_z = 'z' in template[0]
+        f.seek(0)
+        cols = _Columns(_count_lines(path), has_z, dtype)
+        for text in _chunks(f, chunk_bytes):
+            split = _split(text, template, has_z)
+            if split is not None:
+                try:
+                    cols.put(split[0], **split[1])
+                    continue
+                except ValueError:
+                    pass  # a value that is not a plain number, e.g. null
+            lines = [line for line in text.splitlines() if line.strip()]
+            if lines:
+                cols.put(len(lines), **_parse(lines, has_z))
+    return cols.finish()
+
+
+def read_cities(path, dtype=np.float64):
+    """Read a .csv or .jsonl/.ndjson city file into a CityArray."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return read_csv(path, dtype)
+    if ext in ('.jsonl', '.ndjson'):
+        return read_jsonl(path, dtype)
+    raise ValueError(f'{path}: unknown city file type {ext!r}')
@@ -0,0 +1,407 @@
+import itertools
+
+import numpy as np
+
+from spatial import KDTree, SegmentGrid, neighbour_lists
+
+# Array-backed tour constructors. Each takes a CityArray and returns the
+# visiting order as an index array (the return to the start is implied).
+# The dict-based functions in the scripts are thin wrappers around these.
+
+
+# Morton (Z-order) keys, vectorized version of draw.morton_order
+def spread_bits(v):
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def morton_keys(ca):
+    x = np.trunc(ca.x * 10000).astype(np.int64)
+    y = np.trunc(ca.y * 10000).astype(np.int64)
+    return spread_bits(x) | (spread_bits(y) << 1)
+
+
+# Hilbert curve keys: coordinates are normalized to the bounding box and
+# quantized to `bits` per axis, so negative or large values are fine
+def _quantize(values, bits):
+    lo, hi = float(values.min()), float(values.max())
+    scale = ((1 << bits) - 1) / (hi - lo) if hi > lo else 0.0
+    return np.floor((values - lo) * scale).astype(np.uint64)
+
+
+def hilbert_keys(ca, bits=32, chunk=1 << 16):
+    """Hilbert index of each city (2D, or 3D when the cities have z).
+
+    Vectorized form of Skilling's transpose algorithm, run over blocks of
+    `chunk` cities so the ~30 passes per bit level stay in cache. 2D keys
+    come back as one uint64 array; 3D keys need 3 * bits bits and come
+    back as a (high, low) pair of uint64 arrays.
+    """
+    if not len(ca):
+        return np.empty(0, dtype=np.uint64)
+    cols = [ca.x, ca.y] if ca.z is None else [ca.x, ca.y, ca.z]
+    X = [_quantize(np.asarray(c, dtype=np.float64), bits) for c in cols]
+    parts = [_hilbert_block([c[s:s + chunk] for c in X], bits) for s in range(0, len(ca), chunk)]
+    if isinstance(parts[0], tuple):
+        return tuple(np.concatenate(w) for w in zip(*parts))
+    return np.concatenate(parts)
+
+
+def _hilbert_block(X, bits):
+    # Works in place on the quantized columns
+    X = list(X)
+    dims = len(X)
+    one = np.uint64(1)
+
+    # Inverse undo; `mask` is all ones where bit b of X[i] is set
+    for b in range(bits - 1, 0, -1):
+        P = np.uint64((1 << b) - 1)
+        for i in range(dims):
+            mask = np.negative((X[i] >> np.uint64(b)) & one)
+            if i == 0:
+                X[0] ^= mask & P
+                continue
+            X[0] ^= mask & P
+            t = X[0] ^ X[i]
+            t &= P
+            t &= ~mask
+            X[0] ^= t
+            X[i] ^= t
+
+    # Gray encode
+    for i in range(1, dims):
+        X[i] ^= X[i - 1]
+    t = np.zeros_like(X[0])
+    for b in range(bits - 1, 0, -1):
+        t ^= np.negative((X[dims - 1] >> np.uint64(b)) & one) & np.uint64((1 << b) - 1)
+    for i in range(dims):
+        X[i] ^= t
+
+    # Interleave the transposed bits, X[0] most significant at each level
+    if dims == 2 and bits <= 32:
+        return (_spread2(X[0]) << one) | _spread2(X[1])
+    total = dims * bits
+    words = [np.zeros_like(X[0]) for _ in range((total + 63) // 64)]
+    for b in range(bits - 1, -1, -1):
+        for i in range(dims):
+            p = b * dims + (dims - 1 - i)
+            w = words[len(words) - 1 - p // 64]
+            w |= ((X[i] >> np.uint64(b)) & one) << np.uint64(p % 64)
+    return words[0] if len(words) == 1 else tuple(words)
+
+
+def _spread2(v):
+    # Spread the low 32 bits of v so a zero bit sits between each pair
+    v = v & np.uint64(0xFFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def hilbert(ca, bits=32):
+    """Space-filling curve tour: cities sorted by Hilbert index, O(n log n)."""
+    if not len(ca):
+        return np.empty(0, dtype=np.intp)
+    keys = hilbert_keys(ca, bits)
+    if isinstance(keys, tuple):
+        return np.lexsort(keys[::-1])
+    return np.argsort(keys)
+
+
+def nearest_neighbour(ca, start=0, order=None, dim=None):
+    """Greedy nearest-neighbour tour from `start` using a k-d tree.
+
+    `order` ranks the cities for tie-breaking (lower rank wins); by default
+    the original index is used. `dim=2` ignores z.
+    """
+    n = len(ca)
+    if not n:
+        return np.empty(0, dtype=np.intp)
+    order = np.arange(n) if order is None else np.asarray(order, dtype=np.intp)
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+
+    # The tree is built over cities in rank order so its index tie-break
+    # matches the requested ranking
+    coords = ca.coords(order, dim=dim)
+    tree = KDTree(coords)
+    current = int(rank[start])
+    tree.remove(current)
+    path = [current]
+    while len(tree):
+        current = tree.nearest(coords[current])
+        tree.remove(current)
+        path.append(current)
+    return order[np.asarray(path, dtype=np.intp)]
+
+
+def morton_nearest_neighbour(ca):
+    """draw.sort_cities: nearest neighbour starting from the lowest Morton key."""
+    order = np.argsort(morton_keys(ca), kind='stable')
+    if not len(order):
+        return order
+    return nearest_neighbour(ca, start=order[0], order=order)
+
+
+def zap(ca):
+    """new/tsp.zap: sort by (x, y)."""
+    return np.lexsort((ca.y, ca.x))
+
+
+def build_path(ca):
+    """Traveled.build_path: 2D nearest neighbour from min(x + y), reversed."""
+    if not len(ca):
+        return np.empty(0, dtype=np.intp)
+    start = int(np.argmin(ca.x + ca.y))
+    return nearest_neighbour(ca, start=start, dim=2)[::-1]
+
+
+def build_path_axis(ca):
+    """MeetUp.build_path: from min (x, y), always step to min (|dx|, |dy|)."""
+    n = len(ca)
+    if not n:
+        return np.empty(0, dtype=np.intp)
+    x, y = ca.x, ca.y
+    current = int(np.lexsort((y, x))[0])
+    remaining = np.ones(n, dtype=bool)
+    remaining[current] = False
+    path = [current]
+    for _ in range(n - 1):
+        pool = np.flatnonzero(remaining)
+        dx = np.abs(x[pool] - x[current])
+        pool = pool[dx == dx.min()]
+        dy = np.abs(y[pool] - y[current])
+        current = int(pool[np.argmin(dy)])
+        remaining[current] = False
+        path.append(current)
+    return np.asarray(path, dtype=np.intp)
+
+
+# Neighbours connect tries per step. Trying all of them makes boxed-in
+# steps scan every remaining city (quadratic overall); past a few dozen
+# misses a crossing-free edge is rarely found anyway
+CONNECT_CANDIDATES = 64
+
+
+def connect(ca, max_candidates=CONNECT_CANDIDATES):
+    """solved/tsp.connect_cities: closest city whose edge crosses no placed edge.
+
+    Cities are ranked by (x, y) descending. Placed edges live in a
+    SegmentGrid, and an edge touching the current city does not count as
+    a crossing. When every candidate crosses, the last ranked remaining
+    city is taken, as in the original. Only the `max_candidates` nearest
+    remaining cities are tried per step, so a step where the path has
+    boxed itself in falls back early; the tour can then differ from the
+    original's. None tries all of them, matching the original exactly.
+    """
+    n = len(ca)
+    if not n:
+        return np.empty(0, dtype=np.intp)
+    order = np.lexsort((ca.y, ca.x))[::-1]
+    coords = ca.coords(order)
+    pts = [tuple(p) for p in coords.tolist()]
+    span = float(max(np.ptp(coords[:, 0]), np.ptp(coords[:, 1])))
+    grid = SegmentGrid(span / max(1.0, np.sqrt(n)))
+
+    # Candidates come from the k-d tree in increasing distance; the first
+    # one whose edge crosses nothing is taken
+    tree = KDTree(coords)
+    tree.remove(0)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    last = n - 1
+    path = [0]
+    while len(tree):
+        current = path[-1]
+        chosen = -1
+        for j in itertools.islice(tree.iter_nearest(coords[current]), max_candidates):
+            if not grid.crosses(pts[current], pts[j], current, j):
+                chosen = j
+                break
+        if chosen == -1:
+            while visited[last]:
+                last -= 1
+            chosen = last
+        tree.remove(chosen)
+        visited[chosen] = True
+        grid.add(pts[current], pts[chosen], current, chosen)
+        path.append(chosen)
+    return order[np.asarray(path, dtype=np.intp)]
+
+
+# Shared by the edge-based constructors below
+def _knn_pairs(points, k, ids=None):
+    """k-nearest-neighbour pairs of `points` as (lo, hi) with lo <= hi.
+
+    `ids` maps row numbers to city indices (default: the rows themselves).
+    Pairs may repeat; see _by_length.
+    """
+    nb = neighbour_lists(points, k)
+    a = np.repeat(np.arange(len(points)), nb.shape[1])
+    b = nb.ravel()
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    return (lo, hi) if ids is None else (ids[lo], ids[hi])
+
+
+def _by_length(coords, lo, hi):
+    """Distinct (lo, hi) pairs, shortest first, as two lists."""
+    n = len(coords)
+    pairs = np.unique(lo * n + hi)
+    lo, hi = pairs // n, pairs % n
+    diff = coords[lo] - coords[hi]
+    by_length = np.argsort((diff * diff).sum(axis=1), kind='stable')
+    return lo[by_length].tolist(), hi[by_length].tolist()
+
+
+def _find(parent, i):
+    """Union-find root of `i`, halving the path on the way."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def greedy_edge(ca, k=10):
+    """Greedy matching: take candidate edges shortest first.
+
+    Candidates are the k-nearest-neighbour pairs. An edge is accepted
+    unless it would give a city degree 3 or close a cycle early (checked
+    with a union-find). The resulting path fragments are then chained
+    nearest-endpoint first.
+    """
+    n = len(ca)
+    if n < 3:
+        return np.arange(n, dtype=np.intp)
+    coords = ca.coords()
+    parent = list(range(n))
+    adj = [[] for _ in range(n)]
+    accepted = 0
+    for i, j in zip(*_by_length(coords, *_knn_pairs(coords, k))):
+        if len(adj[i]) == 2 or len(adj[j]) == 2:
+            continue
+        ri, rj = _find(parent, i), _find(parent, j)
+        if ri == rj:
+            continue
+        parent[ri] = rj
+        adj[i].append(j)
+        adj[j].append(i)
+        accepted += 1
+        if accepted == n - 1:
+            break
+
+    def walk(start):
+        path = [start]
+        prev, cur = -1, start
+        while True:
+            nxt = [c for c in adj[cur] if c != prev]
+            if not nxt:
+                return path
+            prev, cur = cur, nxt[0]
+            path.append(cur)
+
+    # Chain fragments: leave each one from its far end to the nearest
+    # free endpoint of another fragment
+    ends = [i for i in range(n) if len(adj[i]) < 2]
+    tree = KDTree(coords[ends])
+    slot = {city: s for s, city in enumerate(ends)}
+    order = []
+    current = ends[0]
+    while True:
+        frag = walk(current)
+        order.extend(frag)
+        tree.remove(slot[frag[0]])
+        if frag[-1] != frag[0]:
+            tree.remove(slot[frag[-1]])
+        if not len(tree):
+            break
+        current = ends[tree.nearest(coords[frag[-1]])]
+    return np.asarray(order, dtype=np.intp)
+
+
+def christofides(ca, k=10):
+    """MST-based approximation in the style of Christofides.
+
+    Builds a minimum spanning tree over a sparse candidate graph (k nearest
+    neighbours plus consecutive Hilbert-order pairs, which keeps it
+    connected), matches the odd-degree vertices greedily, and shortcuts an
+    Euler tour of the union. With an exact matching this is the classic
+    1.5-approximation; the greedy matching trades that bound for speed.
+    """
+    n = len(ca)
+    if n < 3:
+        return np.arange(n, dtype=np.intp)
+    coords = ca.coords()
+
+    # Minimum spanning tree (Kruskal) on the candidate graph
+    lo, hi = _knn_pairs(coords, k)
+    curve = hilbert(ca)
+    lo = np.concatenate((lo, np.minimum(curve[:-1], curve[1:])))
+    hi = np.concatenate((hi, np.maximum(curve[:-1], curve[1:])))
+    parent = list(range(n))
+    adj = [[] for _ in range(n)]
+    edges = []
+    for i, j in zip(*_by_length(coords, lo, hi)):
+        ri, rj = _find(parent, i), _find(parent, j)
+        if ri == rj:
+            continue
+        parent[ri] = rj
+        adj[i].append(len(edges))
+        adj[j].append(len(edges))
+        edges.append((i, j))
+        if len(edges) == n - 1:
+            break
+
+    # Greedy matching of odd-degree vertices, shortest candidate pairs
+    # first, leftovers paired nearest-first
+    odd = np.asarray([i for i in range(n) if len(adj[i]) % 2], dtype=np.intp)
+    matched = np.zeros(n, dtype=bool)
+    if len(odd) > 2:
+        for i, j in zip(*_by_length(coords, *_knn_pairs(coords[odd], min(k, len(odd) - 1), odd))):
+            if matched[i] or matched[j]:
+                continue
+            matched[i] = matched[j] = True
+            adj[i].append(len(edges))
+            adj[j].append(len(edges))
+            edges.append((i, j))
+    rest = odd[~matched[odd]]
+    tree = KDTree(coords[rest])
+    free = [True] * len(rest)
+    for s in range(len(rest)):
+        if not free[s]:
+            continue
+        tree.remove(s)
+        t = tree.nearest(coords[rest[s]])
+        tree.remove(t)
+        free[s] = free[t] = False
+        i, j = int(rest[s]), int(rest[t])
+        adj[i].append(len(edges))
+        adj[j].append(len(edges))
+        edges.append((i, j))
+
+    # Euler circuit (Hierholzer), shortcut to the first visit of each city
+    used = [False] * len(edges)
+    cursor = [0] * n
+    stack = [0]
+    seen = np.zeros(n, dtype=bool)
+    order = []
+    while stack:
+        v = stack[-1]
+        while cursor[v] < len(adj[v]) and used[adj[v][cursor[v]]]:
+            cursor[v] += 1
+        if cursor[v] == len(adj[v]):
+            stack.pop()
+            if not seen[v]:
+                seen[v] = True
+                order.append(v)
+            continue
+        e = adj[v][cursor[v]]
+        used[e] = True
+        i, j = edges[e]
+        stack.append(j if i == v else i)
+    return np.asarray(order, dtype=np.intp)
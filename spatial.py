@@ -0,0 +1,485 @@
+import heapq
+import itertools
+
+import numpy as np
+
+# Spatial indexes shared by the solvers and renderers.
+# Everything works on plain (n, d) coordinate arrays and returns integer
+# city indices, so callers keep their own city records untouched.
+
+
+class KDTree:
+    """Static k-d tree over an (n, d) point array with point deletion.
+
+    The tree is built once; `remove` marks a point as visited and keeps a
+    per-node alive count so empty subtrees are skipped during queries.
+    Ties on distance are broken by the smaller point index.
+    """
+
+    def __init__(self, points, leaf_size=8):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim == 1:
+            points = points[:, None]
+        self.points = points
+        self.n, self.dim = points.shape
+        self.leaf_size = max(1, int(leaf_size))
+
+        # Scalar lookups in the query loop are much faster on Python lists
+        self._coords = points.tolist()
+        self._axis = []
+        self._split = []
+        self._left = []
+        self._right = []
+        self._parent = []
+        self._count = []
+        self._members = []
+        self._leaf_of = [0] * self.n
+        self._build()
+
+    def _new_node(self, parent, count):
+        self._axis.append(-1)
+        self._split.append(0.0)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._parent.append(parent)
+        self._count.append(count)
+        self._members.append(None)
+        return len(self._axis) - 1
+
+    def _build(self):
+        if not self.n:
+            return
+        root = self._new_node(-1, self.n)
+        stack = [(root, np.arange(self.n))]
+        while stack:
+            node, idx = stack.pop()
+            if len(idx) <= self.leaf_size:
+                members = sorted(idx.tolist())
+                self._members[node] = members
+                for i in members:
+                    self._leaf_of[i] = node
+                continue
+
+            # Split on the axis with the widest spread, at the median
+            pts = self.points[idx]
+            spread = pts.max(axis=0) - pts.min(axis=0)
+            axis = int(np.argmax(spread))
+            if spread[axis] == 0:
+                members = sorted(idx.tolist())
+                self._members[node] = members
+                for i in members:
+                    self._leaf_of[i] = node
+                continue
+            mid = len(idx) // 2
+            part = np.argpartition(pts[:, axis], mid)
+            idx = idx[part]
+            split = float(self.points[idx[mid], axis])
+            left_idx, right_idx = idx[:mid], idx[mid:]
+
+            self._axis[node] = axis
+            self._split[node] = split
+            left = self._new_node(node, len(left_idx))
+            right = self._new_node(node, len(right_idx))
+            self._left[node] = left
+            self._right[node] = right
+            stack.append((left, left_idx))
+            stack.append((right, right_idx))
+
+    def __len__(self):
+        return self._count[0] if self._count else 0
+
+    def remove(self, i):
+        """Delete point `i` from the tree (it will no longer be returned)."""
+        node = self._leaf_of[i]
+        self._members[node].remove(i)
+        while node != -1:
+            self._count[node] -= 1
+            node = self._parent[node]
+
+    def nearest(self, q):
+        """Return the index of the closest remaining point to `q`, or -1.
+
+        NaN distances never win; when there are only NaN distances the
+        highest remaining index is returned.
+        """
+        if not len(self):
+            return -1
+        q = [float(v) for v in q]
+        coords, count, members = self._coords, self._count, self._members
+        axis_of, split_of = self._axis, self._split
+        left_of, right_of = self._left, self._right
+        dim = self.dim
+
+        best_d = float('inf')
+        best_i = -1
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            # `>` rather than `>=` so an equally distant, lower index can win
+            if not count[node] or bound > best_d:
+                continue
+            leaf = members[node]
+            if leaf is not None:
+                for i in leaf:
+                    p = coords[i]
+                    d = 0.0
+                    for k in range(dim):
+                        t = p[k] - q[k]
+                        d += t * t
+                    if d < best_d or (d == best_d and i < best_i):
+                        best_d = d
+                        best_i = i
+                continue
+            diff = q[axis_of[node]] - split_of[node]
+            if diff < 0:
+                near, far = left_of[node], right_of[node]
+            else:
+                near, far = right_of[node], left_of[node]
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        if best_i == -1:
+            # Every distance was NaN (NaN coordinates). A list scan keeping
+            # the first `d < best` then ends with nothing and pops the last
+            # remaining point, so return the highest remaining index
+            best_i = max(i for leaf in members if leaf for i in leaf)
+        return best_i
+
+
+    def iter_nearest(self, q):
+        """Yield remaining point indices in increasing distance from `q`.
+
+        Best-first search over the tree, so taking only the first few
+        candidates costs about as much as a k-nearest query. Ties are
+        yielded in index order.
+        """
+        q = [float(v) for v in q]
+        coords, count, members = self._coords, self._count, self._members
+        axis_of, split_of = self._axis, self._split
+        left_of, right_of = self._left, self._right
+        dim = self.dim
+
+        # Nodes sort before points at equal distance so a tied point with a
+        # lower index inside an unopened node still comes out first
+        heap = [(0.0, 0, 0)] if len(self) else []
+        while heap:
+            d, kind, item = heapq.heappop(heap)
+            if kind:
+                yield item
+                continue
+            if not count[item]:
+                continue
+            leaf = members[item]
+            if leaf is not None:
+                for i in leaf:
+                    p = coords[i]
+                    dd = 0.0
+                    for k in range(dim):
+                        t = p[k] - q[k]
+                        dd += t * t
+                    heapq.heappush(heap, (dd, 1, i))
+                continue
+            diff = q[axis_of[item]] - split_of[item]
+            near, far = (left_of[item], right_of[item]) if diff < 0 else (right_of[item], left_of[item])
+            heapq.heappush(heap, (d, 0, near))
+            heapq.heappush(heap, (max(d, diff * diff), 0, far))
+
+    def query(self, q, k):
+        """Return up to `k` remaining point indices nearest to `q`."""
+        return list(itertools.islice(self.iter_nearest(q), k))
+
+
+# Distance blocks are computed in row chunks of at most BLOCK_PAIRS
+# member-candidate pairs; a cell needing more than CELL_PAIRS pairs (a
+# dense cluster) is solved on a finer grid of its own
+BLOCK_PAIRS = 1 << 20
+CELL_PAIRS = 1 << 24
+
+
+def _nearest_in(points, members, cand, k):
+    """k nearest of `cand` to each member (excluding itself), row-chunked.
+
+    Returns the neighbour ids, closest first, and the squared k-th distance.
+    """
+    idx = np.empty((len(members), k), dtype=np.intp)
+    kth = np.empty(len(members))
+    step = max(1, BLOCK_PAIRS // len(cand))
+    for r0 in range(0, len(members), step):
+        rows = members[r0:r0 + step]
+        diff = points[rows][:, None, :] - points[cand][None, :, :]
+        d2 = (diff * diff).sum(axis=2)
+        d2[rows[:, None] == cand[None, :]] = np.inf
+        part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        pd2 = np.take_along_axis(d2, part, axis=1)
+        rank = np.argsort(pd2, axis=1, kind='stable')
+        idx[r0:r0 + step] = cand[np.take_along_axis(part, rank, axis=1)]
+        kth[r0:r0 + step] = np.take_along_axis(pd2, rank[:, -1:], axis=1)[:, 0]
+    return idx, kth
+
+
+def neighbour_lists(points, k):
+    """Return an (n, k) array of each point's k nearest other points.
+
+    Points are bucketed into a uniform x/y grid holding about k points per
+    cell, and each cell is solved in vectorized blocks against its 3x3
+    neighbourhood. A cell whose block would exceed CELL_PAIRS distances
+    (a dense cluster) is solved by a recursive call on just its 3x3
+    points, whose grid then fits the cluster. Rows whose k-th neighbour could lie
+    outside the neighbourhood are finished with exact k-d tree queries.
+    Each row is sorted closest first.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    k = max(0, min(int(k), n - 1))
+    out = np.empty((n, k), dtype=np.intp)
+    if not k:
+        return out
+
+    xy = points[:, :2]
+    lo = xy.min(axis=0)
+    span = np.maximum(xy.max(axis=0) - lo, 1e-12)
+    cell = float(np.sqrt(span[0] * span[1] * k / n)) or float(span.max())
+    cx = ((xy[:, 0] - lo[0]) // cell).astype(np.int64)
+    cy = ((xy[:, 1] - lo[1]) // cell).astype(np.int64)
+    ncy = int(cy.max()) + 3
+    key = (cx + 1) * ncy + (cy + 1)
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    cells, starts = np.unique(sorted_key, return_index=True)
+    ends = np.append(starts[1:], n)
+    span_of = {int(c): (int(s), int(e)) for c, s, e in zip(cells, starts, ends)}
+
+    unresolved = []
+    offsets = [dx * ncy + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+    for c, s, e in zip(cells.tolist(), starts.tolist(), ends.tolist()):
+        members = order[s:e]
+        # Members first, so their rows of a recursive solve are the first ones
+        cand = np.concatenate([members] + [order[slice(*span_of[c + o])] for o in offsets if c + o in span_of])
+        if len(cand) <= k:
+            unresolved.extend(members.tolist())
+            continue
+        if len(members) * len(cand) > CELL_PAIRS and len(cand) < n:
+            local = neighbour_lists(points[cand], k)[:len(members)]
+            out[members] = cand[local]
+            diff = points[members] - points[out[members, -1]]
+            kth = (diff * diff).sum(axis=1)
+        else:
+            out[members], kth = _nearest_in(points, members, cand, k)
+
+        # The 3x3 block is exact only if the k-th neighbour is closer than
+        # the nearest edge of the block
+        bx, by = c // ncy - 1, c % ncy - 1
+        px, py = xy[members, 0] - lo[0], xy[members, 1] - lo[1]
+        margin = np.minimum.reduce([px - (bx - 1) * cell, (bx + 2) * cell - px,
+                                    py - (by - 1) * cell, (by + 2) * cell - py])
+        unresolved.extend(members[kth > margin * margin].tolist())
+
+    if unresolved:
+        tree = KDTree(points)
+        for i in unresolved:
+            out[i] = [j for j in tree.query(points[i], k + 1) if j != i][:k]
+    return out
+
+
+def _cross(u, v):
+    return (u[1] * v[2] - u[2] * v[1],
+            u[2] * v[0] - u[0] * v[2],
+            u[0] * v[1] - u[1] * v[0])
+
+
+def segments_cross(a0, a1, b0, b1):
+    """Scalar port of the solved/tsp.py crossing test.
+
+    Points may be 2D or 3D (2D points get z = 0). Segments that merely
+    touch, including at a shared endpoint, count as crossing.
+    """
+    if len(a0) == 2 and len(b0) == 2:
+        # Planar case: only the z component of each cross product is non-zero
+        dax, day = a1[0] - a0[0], a1[1] - a0[1]
+        c1 = dax * (b0[1] - a0[1]) - day * (b0[0] - a0[0])
+        c2 = dax * (b1[1] - a0[1]) - day * (b1[0] - a0[0])
+        if c1 * c2 > 0:
+            return False
+        dbx, dby = b1[0] - b0[0], b1[1] - b0[1]
+        c3 = dbx * (a0[1] - b0[1]) - dby * (a0[0] - b0[0])
+        c4 = dbx * (a1[1] - b0[1]) - dby * (a1[0] - b0[0])
+        return c3 * c4 <= 0
+    a0, a1, b0, b1 = (tuple(p) + (0.0,) * (3 - len(p)) for p in (a0, a1, b0, b1))
+    da = (a1[0] - a0[0], a1[1] - a0[1], a1[2] - a0[2])
+    db = (b1[0] - b0[0], b1[1] - b0[1], b1[2] - b0[2])
+    c1 = _cross(da, (b0[0] - a0[0], b0[1] - a0[1], b0[2] - a0[2]))
+    c2 = _cross(da, (b1[0] - a0[0], b1[1] - a0[1], b1[2] - a0[2]))
+    if any(p * q > 0 for p, q in zip(c1, c2)):
+        return False
+    c3 = _cross(db, (a0[0] - b0[0], a0[1] - b0[1], a0[2] - b0[2]))
+    c4 = _cross(db, (a1[0] - b0[0], a1[1] - b0[1], a1[2] - b0[2]))
+    return all(p * q <= 0 for p, q in zip(c3, c4))
+
+
+class SegmentGrid:
+    """Uniform grid of placed line segments for fast crossing queries.
+
+    Each segment is registered in every cell it passes through (a column
+    sweep over its x-extent), so adding one costs O(length / cell_size)
+    and a query only tests segments that share a cell with the candidate
+    and whose bounding boxes overlap it. Coordinates are bucketed on x/y;
+    the crossing test itself uses z when the points have it.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size) if cell_size > 0 else 1.0
+        self._cells = {}
+        self._ends = []
+        self._ids = []
+        self._boxes = []
+
+    def __len__(self):
+        return len(self._ends)
+
+    def _cover(self, a, b):
+        cs = self.cell_size
+        eps = cs * 1e-9
+        (x0, y0), (x1, y1) = a[:2], b[:2]
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        cx0, cx1 = int(x0 // cs), int(x1 // cs)
+        slope = (y1 - y0) / (x1 - x0) if x1 != x0 else 0.0
+        for cx in range(cx0, cx1 + 1):
+            if x1 == x0:
+                ya, yb = y0, y1
+            else:
+                ya = y0 + (max(x0, cx * cs) - x0) * slope
+                yb = y0 + (min(x1, (cx + 1) * cs) - x0) * slope
+            if ya > yb:
+                ya, yb = yb, ya
+            for cy in range(int((ya - eps) // cs), int((yb + eps) // cs) + 1):
+                yield cx, cy
+
+    def add(self, a, b, i=-1, j=-1):
+        """Add the segment a-b; `i`/`j` are optional endpoint city ids."""
+        seg = len(self._ends)
+        self._ends.append((a, b))
+        self._ids.append((i, j))
+        self._boxes.append((min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1])))
+        cells = self._cells
+        for key in self._cover(a, b):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [seg]
+            else:
+                bucket.append(seg)
+        return seg
+
+    def candidates(self, a, b):
+        """Segment ids sharing a cell with a-b and overlapping its bounding box."""
+        lo_x, hi_x = min(a[0], b[0]), max(a[0], b[0])
+        lo_y, hi_y = min(a[1], b[1]), max(a[1], b[1])
+        seen = set()
+        boxes, cells = self._boxes, self._cells
+        for key in self._cover(a, b):
+            for seg in cells.get(key, ()):
+                if seg in seen:
+                    continue
+                seen.add(seg)
+                bx0, by0, bx1, by1 = boxes[seg]
+                if bx0 <= hi_x and lo_x <= bx1 and by0 <= hi_y and lo_y <= by1:
+                    yield seg
+
+    def near(self, p, ring):
+        """Segment ids registered in the cells exactly `ring` cells from p's.
+
+        Calling it for ring = 0, 1, 2... walks outwards without revisiting
+        a cell; a segment spanning several cells can come up more than once.
+        """
+        cs = self.cell_size
+        cx, cy = int(p[0] // cs), int(p[1] // cs)
+        cells = self._cells
+        for dx in range(-ring, ring + 1):
+            step = 1 if abs(dx) == ring else 2 * ring
+            for dy in range(-ring, ring + 1, step or 1):
+                yield from cells.get((cx + dx, cy + dy), ())
+
+    def ends(self, seg):
+        """Endpoint ids of segment `seg` as given to `add`."""
+        return self._ids[seg]
+
+    def crosses(self, a, b, i=-1, j=-1):
+        """True if a-b crosses a stored segment.
+
+        Segments sharing an endpoint id with `i` or `j` are skipped, so an
+        edge leaving the end of the previous edge is not a crossing.
+        """
+        ends, ids = self._ends, self._ids
+        for seg in self.candidates(a, b):
+            si, sj = ids[seg]
+            if si != -1 and (si == i or si == j or sj == i or sj == j):
+                continue
+            p, q = ends[seg]
+            if segments_cross(p, q, a, b):
+                return True
+        return False
+
+
+class SegmentIndex:
+    """Static grid over many segments for window queries, built with NumPy.
+
+    Unlike SegmentGrid this is built once from (m, 2) endpoint arrays `a`
+    and `b`. Each segment no longer than a cell is filed under the cell
+    of its bounding box's lower corner, so a window query reads one run
+    of the sorted cell table per grid row, widened by one cell below and
+    to the left. Longer segments are kept apart and tested directly.
+    """
+
+    def __init__(self, a, b, cell_size=None):
+        a = np.asarray(a, dtype=np.float64)[:, :2]
+        b = np.asarray(b, dtype=np.float64)[:, :2]
+        m = len(a)
+        self.lo = np.minimum(a, b)
+        self.hi = np.maximum(a, b)
+        extent = (self.hi - self.lo).max(axis=1) if m else np.zeros(0)
+        origin = self.lo.min(axis=0) if m else np.zeros(2)
+        span = self.hi.max(axis=0) - origin if m else np.zeros(2)
+        if cell_size is None:
+            # A few mean segments wide, so few segments count as long, but
+            # never more cells than segments
+            cell_size = max(4 * float(extent.mean()) if m else 0.0,
+                            float(np.sqrt(span[0] * span[1] / max(m, 1))),
+                            float(span.max()) / max(m, 1))
+        self.cell_size = cs = float(cell_size) if cell_size > 0 else 1.0
+        self.origin = origin
+        self.top = origin + span
+
+        short = extent <= cs
+        self.long = np.flatnonzero(~short)
+        items = np.flatnonzero(short)
+        cx = ((self.lo[items, 0] - origin[0]) // cs).astype(np.int64)
+        cy = ((self.lo[items, 1] - origin[1]) // cs).astype(np.int64)
+        self.nx = int(span[0] // cs) + 1
+        self.ny = int(span[1] // cs) + 1
+        key = cy * self.nx + cx
+        order = np.argsort(key, kind='stable')
+        self.items = items[order]
+        self.starts = np.searchsorted(key[order], np.arange(self.nx * self.ny + 1))
+
+    def __len__(self):
+        return len(self.lo)
+
+    def query(self, x0, x1, y0, y1):
+        """Sorted ids of the segments whose bounding box meets the window."""
+        cs, (ox, oy) = self.cell_size, self.origin
+        if x0 <= ox and y0 <= oy and x1 >= self.top[0] and y1 >= self.top[1]:
+            return np.arange(len(self.lo))
+        cx0 = max(int((x0 - ox) // cs) - 1, 0)
+        cx1 = min(int((x1 - ox) // cs), self.nx - 1)
+        cy0 = max(int((y0 - oy) // cs) - 1, 0)
+        cy1 = min(int((y1 - oy) // cs), self.ny - 1)
+        cand = self.long
+        if cx0 <= cx1 and cy0 <= cy1:
+            rows = np.arange(cy0, cy1 + 1) * self.nx
+            first = self.starts[rows + cx0]
+            count = self.starts[rows + cx1 + 1] - first
+            # Concatenated aranges first[r] .. first[r] + count[r]
+            offset = np.repeat(first - np.cumsum(count) + count, count)
+            cand = np.concatenate((self.items[offset + np.arange(int(count.sum()))], cand))
+        lo, hi = self.lo[cand], self.hi[cand]
+        keep = (lo[:, 0] <= x1) & (hi[:, 0] >= x0) & (lo[:, 1] <= y1) & (hi[:, 1] >= y0)
+        return np.sort(cand[keep])
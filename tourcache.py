@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import improve
+import solvers
+
+# Content-addressed on-disk cache of solved tours. The key is a hash of
+# the coordinates plus the solver name and its parameters, so the same
+# instance solved the same way is found again whatever file it came
+# from. Each entry is one compact .npy index array; the least
+# recently used entries are evicted once the cache exceeds `max_bytes`.
+
+
+class TourCache:
+    """Tours stored as `<root>/<key>.npy`, with LRU eviction by total size.
+
+    `hits` and `misses` count lookups made through this instance.
+    """
+
+    def __init__(self, root, max_bytes=256 << 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(ca, solver, **params):
+        """Hash of the coordinates, the solver name and its parameters."""
+        digest = hashlib.sha256()
+        digest.update(f'{len(ca)}:{ca.dim}:{solver}:'.encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        for col in (ca.x, ca.y) if ca.z is None else (ca.x, ca.y, ca.z):
+            digest.update(np.ascontiguousarray(col, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.npy')
+
+    def get(self, key):
+        """Return the cached tour for `key`, or None."""
+        path = self._path(key)
+        try:
+            tour = np.load(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return tour.astype(np.intp)
+
+    def put(self, key, tour):
+        tour = np.asarray(tour)
+        # Index arrays are stored in the smallest integer type that fits
+        dtype = np.uint32 if not len(tour) or tour.max() < 1 << 32 else np.int64
+        tmp = self._path(key) + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, tour.astype(dtype))
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def entries(self):
+        """(mtime, size, path) of every entry, oldest first."""
+        out = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith('.npy'):
+                st = entry.stat()
+                out.append((st.st_mtime_ns, st.st_size, entry.path))
+        return sorted(out)
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits `max_bytes`."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        entries = self.entries()
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+    def solve(self, ca, solver='connect', improver=None, **options):
+        """`solvers.<solver>` (then `improve.<improver>`) on `ca`, cached."""
+        key = self.key(ca, solver, improver=improver, **options)
+        tour = self.get(key)
+        if tour is None:
+            tour = getattr(solvers, solver)(ca, **options)
+            if improver:
+                tour = getattr(improve, improver)(ca, tour)[0]
+            self.put(key, tour)
+        return tour